@@ -15,7 +15,7 @@ from app.api.routes.auth import get_current_user
 from app.core.backup import (
     backup_database,
     list_backups,
-    cleanup_backups,
+    apply_retention_policy,
     get_backup_manager,
 )
 from app.db import db
@@ -155,19 +155,25 @@ async def get_backups(admin_user = Depends(require_admin)):
 @router.delete("/backups/cleanup")
 async def cleanup_old_backups(
     retention_days: int = Query(default=30, ge=1, le=365),
+    max_count: Optional[int] = Query(default=None, ge=1),
+    max_size_mb: Optional[int] = Query(default=None, ge=1),
     admin_user = Depends(require_admin)
 ):
     """
-    Remove backups older than retention period.
+    Remove backups older than retention period, and optionally beyond the
+    newest max_count backups or a total size quota.
     
     SECURITY: Admin only.
     """
-    removed = cleanup_backups(retention_days)
+    max_bytes = max_size_mb * 1024 * 1024 if max_size_mb is not None else None
+    removed = await apply_retention_policy(retention_days, max_count, max_bytes)
     
     return {
         "success": True,
         "removed_count": removed,
         "retention_days": retention_days,
+        "max_count": max_count,
+        "max_size_mb": max_size_mb,
         "message": f"Removed {removed} old backup(s)"
     }
 
@@ -2,6 +2,7 @@
 AI generation routes with credit deduction
 """
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 
@@ -49,6 +50,68 @@ class GenerateResponse(BaseModel):
     remaining_credits: int
 
 
+async def _charge_credits(current_user, action: str, cost: int, finding_title: Optional[str]):
+    """
+    Check the user's organization balance, deduct `cost` and log the usage.
+    
+    Returns:
+        (organization before the charge, organization after the charge)
+    """
+    # Get user's organization (required for credit deduction)
+    if not current_user.organizationId:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User must belong to an organization to use AI features"
+        )
+    
+    # Check credit balance
+    organization = await db.organization.find_unique(
+        where={"id": current_user.organizationId}
+    )
+    
+    if not organization:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Organization not found"
+        )
+    
+    if organization.creditBalance < cost:
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail=f"Insufficient credits. Required: {cost}, Available: {organization.creditBalance}"
+        )
+    
+    # Deduct credits and log usage (atomic transaction)
+    updated_org = await db.organization.update(
+        where={"id": organization.id},
+        data={
+            "creditBalance": {
+                "decrement": cost
+            }
+        }
+    )
+    
+    # Log the AI usage
+    await db.aiusagelog.create(
+        data={
+            "userId": current_user.id,
+            "organizationId": organization.id,
+            "action": action,
+            "cost": cost,
+            "metadata": f"Type: {action}, Title: {finding_title or 'N/A'}"
+        }
+    )
+    
+    return organization, updated_org
+
+
+async def _refund_credits(organization_id: str, cost: int) -> None:
+    await db.organization.update(
+        where={"id": organization_id},
+        data={"creditBalance": {"increment": cost}}
+    )
+
+
 @router.post("/generate", response_model=GenerateResponse)
 async def generate_ai_content(
     request: GenerateRequest,
@@ -70,50 +133,8 @@ async def generate_ai_content(
         
         # Calculate cost
         cost = COST_MAP[request.type]
-        
-        # Get user's organization (required for credit deduction)
-        if not current_user.organizationId:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="User must belong to an organization to use AI features"
-            )
-        
-        # Check credit balance
-        organization = await db.organization.find_unique(
-            where={"id": current_user.organizationId}
-        )
-        
-        if not organization:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Organization not found"
-            )
-        
-        if organization.creditBalance < cost:
-            raise HTTPException(
-                status_code=status.HTTP_402_PAYMENT_REQUIRED,
-                detail=f"Insufficient credits. Required: {cost}, Available: {organization.creditBalance}"
-            )
-        
-        # Deduct credits and log usage (atomic transaction)
-        updated_org = await db.organization.update(
-            where={"id": organization.id},
-            data={
-                "creditBalance": {
-                    "decrement": cost
-                }
-            }
-        )
-        
-        # Log the AI usage
-        await db.aiusagelog.create(
-            data={
-                "userId": current_user.id,
-                "organizationId": organization.id,
-                "action": request.type,
-                "cost": cost,
-                "metadata": f"Type: {request.type}, Title: {request.finding_title or 'N/A'}"
-            }
+        organization, updated_org = await _charge_credits(
+            current_user, request.type, cost, request.finding_title
         )
         
         # Call the appropriate AI service method based on request type
@@ -195,10 +216,7 @@ async def generate_ai_content(
         
         except RuntimeError as e:
             # AI service error - refund credits
-            await db.organization.update(
-                where={"id": organization.id},
-                data={"creditBalance": {"increment": cost}}
-            )
+            await _refund_credits(organization.id, cost)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=str(e)
@@ -222,3 +240,54 @@ async def generate_ai_content(
             detail=f"Failed to generate AI content: {str(e)}"
         )
 
+
+
+class FindingStreamRequest(BaseModel):
+    finding_title: str
+    severity: Optional[str] = None
+    current_description: Optional[str] = None
+
+
+@router.post("/finding/stream")
+async def stream_finding_text(
+    request: FindingStreamRequest,
+    current_user = Depends(get_current_user)
+):
+    """
+    Stream a generated finding description as plain text chunks.
+    
+    Charged like `generate_finding`. The first chunk is awaited before the
+    response starts, so failures to reach the model still return an error
+    status (and are refunded) instead of an empty 200.
+    """
+    cost = COST_MAP["generate_finding"]
+    organization, _ = await _charge_credits(
+        current_user, "generate_finding", cost, request.finding_title
+    )
+    
+    chunks = ai_service.stream_finding_text(
+        finding_title=request.finding_title,
+        severity=request.severity or "Medium",
+        current_description=request.current_description
+    )
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = ""
+    except RuntimeError as e:
+        await _refund_credits(organization.id, cost)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    
+    async def body():
+        yield first
+        try:
+            async for chunk in chunks:
+                yield chunk
+        except RuntimeError:
+            # Headers are already sent; refund and end the stream early
+            await _refund_credits(organization.id, cost)
+    
+    return StreamingResponse(body(), media_type="text/plain; charset=utf-8")
@@ -3,8 +3,9 @@ Import routes for external scan tools (Burp Suite, Nessus, etc.)
 
 Allows importing findings from external security tools into Atomik projects.
 """
+import asyncio
 import logging
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from pydantic import BaseModel
 
@@ -13,6 +14,7 @@ from app.api.routes.findings import generate_finding_reference_id
 from app.db import db
 from app.services.burp_parser import burp_parser
 from app.services.nessus_parser import nessus_parser
+from app.services.parse_pool import PARALLEL_PARSE_THRESHOLD
 from app.services.qualys_parser import qualys_parser
 from app.services.rich_text_service import RichTextService
 
@@ -204,6 +206,46 @@ async def import_burp_findings(
     )
 
 
+# Rich-text fields of an Atomik row that are sanitized before storage
+SANITIZED_FIELDS = ('description', 'evidence', 'remediation', 'references')
+
+
+def _collect_rows(
+    parse: Callable[..., Iterator[Any]],
+    convert: Callable[[Any], Dict[str, Any]],
+    source: Any,
+    skip_informational: bool
+) -> Tuple[List[Dict[str, Any]], int, int]:
+    """
+    Parse a scanner export and convert each finding to an Atomik row as it
+    is parsed. CPU-bound; run via asyncio.to_thread.
+    
+    Returns:
+        (rows, parsed count, skipped informational count)
+    """
+    rows = []
+    parsed_count = 0
+    skipped_count = 0
+    for scanner_finding in parse(source):
+        parsed_count += 1
+        
+        # Skip informational if requested
+        if skip_informational and scanner_finding.severity == 'Informational':
+            skipped_count += 1
+            continue
+        
+        # Convert to Atomik format
+        rows.append(convert(scanner_finding))
+    return rows, parsed_count, skipped_count
+
+
+def _sanitize_rows(rows: List[Dict[str, Any]]) -> None:
+    """Sanitize the rich-text fields of Atomik rows in place (CPU-bound)."""
+    for row in rows:
+        for field in SANITIZED_FIELDS:
+            row[field] = RichTextService.sanitize_html(row.get(field) or '') or None
+
+
 @router.post("/nessus/{project_id}", response_model=ImportResponse)
 async def import_nessus_findings(
     project_id: str,
@@ -255,29 +297,29 @@ async def import_nessus_findings(
             detail="Access denied"
         )
     
-    # Read and parse XML
+    # Parse Nessus XML straight from the spooled upload, without loading
+    # the whole document into memory; large exports fan out across processes
+    if (file.size or 0) >= PARALLEL_PARSE_THRESHOLD:
+        parse = nessus_parser.parse_parallel
+    else:
+        parse = nessus_parser.parse_stream
+    
+    # Findings are converted as they are parsed, so only the Atomik rows
+    # (never the full NessusFinding list as well) are held in memory. The
+    # whole file is still parsed before anything is written, so a malformed
+    # export imports nothing. Parsing runs in a worker thread to keep the
+    # event loop responsive during large imports.
     try:
-        content = await file.read()
-        xml_content = content.decode('utf-8')
-    except UnicodeDecodeError:
-        try:
-            xml_content = content.decode('latin-1')
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Could not decode file: {str(e)}"
-            )
-    
-    # Parse Nessus XML
-    try:
-        nessus_findings = nessus_parser.parse_xml(xml_content)
+        atomik_rows, parsed_count, skipped_count = await asyncio.to_thread(
+            _collect_rows, parse, nessus_parser.to_atomik_format, file.file, skip_informational
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     
-    if not nessus_findings:
+    if not parsed_count:
         return ImportResponse(
             success=True,
             message="No findings found in the Nessus export file",
@@ -296,29 +338,20 @@ async def import_nessus_findings(
     existing_source_ids = {f.sourceId for f in existing_findings if f.sourceId}
     
     imported_findings = []
-    skipped_count = 0
     
-    for nessus_finding in nessus_findings:
-        # Skip informational if requested
-        if skip_informational and nessus_finding.severity == 'Informational':
-            skipped_count += 1
-            continue
-        
-        # Convert to Atomik format
-        atomik_data = nessus_parser.to_atomik_format(nessus_finding)
-        
-        # Skip duplicates
+    # Skip duplicates
+    new_rows = []
+    for atomik_data in atomik_rows:
         if atomik_data.get('source_id') in existing_source_ids:
-            logger.debug(f"Skipping duplicate finding: {nessus_finding.plugin_name}")
+            logger.debug(f"Skipping duplicate finding: {atomik_data['title']}")
             skipped_count += 1
             continue
-        
-        # Sanitize HTML content
-        description = RichTextService.sanitize_html(atomik_data.get('description', '')) or None
-        evidence = RichTextService.sanitize_html(atomik_data.get('evidence', '')) or None
-        remediation = RichTextService.sanitize_html(atomik_data.get('remediation', '')) or None
-        references = RichTextService.sanitize_html(atomik_data.get('references', '')) or None
-        
+        new_rows.append(atomik_data)
+    
+    # Sanitize HTML content off the event loop
+    await asyncio.to_thread(_sanitize_rows, new_rows)
+    
+    for atomik_data in new_rows:
         # Generate unique reference ID
         reference_id = await generate_finding_reference_id(project.clientId)
         
@@ -328,16 +361,16 @@ async def import_nessus_findings(
                 data={
                     "referenceId": reference_id,
                     "title": atomik_data['title'],
-                    "description": description,
+                    "description": atomik_data['description'],
                     "severity": atomik_data['severity'].upper(),
                     "projectId": project_id,
                     "createdById": current_user.id,
                     "cvssScore": atomik_data.get('cvss_score'),
                     "cvssVector": atomik_data.get('cvss_vector'),
                     "cveId": atomik_data.get('cve_id'),
-                    "evidence": evidence,
-                    "remediation": remediation,
-                    "references": references,
+                    "evidence": atomik_data['evidence'],
+                    "remediation": atomik_data['remediation'],
+                    "references": atomik_data['references'],
                     "affectedSystems": atomik_data.get('affected_systems'),
                     "affectedAssetsCount": atomik_data.get('affected_assets_count', 1),
                     "source": "nessus",
@@ -422,29 +455,25 @@ async def import_qualys_findings(
             detail="Access denied"
         )
     
-    # Read and parse XML
-    try:
-        content = await file.read()
-        xml_content = content.decode('utf-8')
-    except UnicodeDecodeError:
-        try:
-            xml_content = content.decode('latin-1')
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Could not decode file: {str(e)}"
-            )
+    # Parse Qualys XML straight from the spooled upload, without loading
+    # the whole document into memory; large exports fan out across processes
+    if (file.size or 0) >= PARALLEL_PARSE_THRESHOLD:
+        parse = qualys_parser.parse_parallel
+    else:
+        parse = qualys_parser.parse_stream
     
-    # Parse Qualys XML
+    # Converted as parsed and off the event loop, as for Nessus imports
     try:
-        qualys_findings = qualys_parser.parse_xml(xml_content)
+        atomik_rows, parsed_count, skipped_count = await asyncio.to_thread(
+            _collect_rows, parse, qualys_parser.to_atomik_format, file.file, skip_informational
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     
-    if not qualys_findings:
+    if not parsed_count:
         return ImportResponse(
             success=True,
             message="No findings found in the Qualys export file",
@@ -463,29 +492,20 @@ async def import_qualys_findings(
     existing_source_ids = {f.sourceId for f in existing_findings if f.sourceId}
     
     imported_findings = []
-    skipped_count = 0
     
-    for qualys_finding in qualys_findings:
-        # Skip informational if requested
-        if skip_informational and qualys_finding.severity == 'Informational':
-            skipped_count += 1
-            continue
-        
-        # Convert to Atomik format
-        atomik_data = qualys_parser.to_atomik_format(qualys_finding)
-        
-        # Skip duplicates
+    # Skip duplicates
+    new_rows = []
+    for atomik_data in atomik_rows:
         if atomik_data.get('source_id') in existing_source_ids:
-            logger.debug(f"Skipping duplicate finding: {qualys_finding.title}")
+            logger.debug(f"Skipping duplicate finding: {atomik_data['title']}")
             skipped_count += 1
             continue
-        
-        # Sanitize HTML content
-        description = RichTextService.sanitize_html(atomik_data.get('description', '')) or None
-        evidence = RichTextService.sanitize_html(atomik_data.get('evidence', '')) or None
-        remediation = RichTextService.sanitize_html(atomik_data.get('remediation', '')) or None
-        references = RichTextService.sanitize_html(atomik_data.get('references', '')) or None
-        
+        new_rows.append(atomik_data)
+    
+    # Sanitize HTML content off the event loop
+    await asyncio.to_thread(_sanitize_rows, new_rows)
+    
+    for atomik_data in new_rows:
         # Generate unique reference ID
         reference_id = await generate_finding_reference_id(project.clientId)
         
@@ -495,16 +515,16 @@ async def import_qualys_findings(
                 data={
                     "referenceId": reference_id,
                     "title": atomik_data['title'],
-                    "description": description,
+                    "description": atomik_data['description'],
                     "severity": atomik_data['severity'].upper(),
                     "projectId": project_id,
                     "createdById": current_user.id,
                     "cvssScore": atomik_data.get('cvss_score'),
                     "cvssVector": atomik_data.get('cvss_vector'),
                     "cveId": atomik_data.get('cve_id'),
-                    "evidence": evidence,
-                    "remediation": remediation,
-                    "references": references,
+                    "evidence": atomik_data['evidence'],
+                    "remediation": atomik_data['remediation'],
+                    "references": atomik_data['references'],
                     "affectedSystems": atomik_data.get('affected_systems'),
                     "affectedAssetsCount": atomik_data.get('affected_assets_count', 1),
                     "source": "qualys",
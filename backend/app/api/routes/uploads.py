@@ -8,6 +8,7 @@ All uploaded files are validated using:
 3. SVG sanitization (removes embedded scripts)
 4. File size limits
 """
+import asyncio
 import os
 import re
 import uuid
@@ -20,7 +21,8 @@ import aiofiles
 
 from app.api.routes.auth import get_current_user
 from app.core.config import settings
-from app.core.file_validation import validate_upload, is_safe_image
+from app.core.compression import PRECOMPRESS_EXTENSIONS, write_precompressed
+from app.core.file_validation import ais_safe_image
 from app.db import db
 
 logger = logging.getLogger(__name__)
@@ -159,7 +161,7 @@ async def upload_screenshot(
     ext = get_file_extension(file.filename)
     
     # SECURITY: Magic byte validation - verify file content matches extension
-    is_safe, reason = is_safe_image(content, ext)
+    is_safe, reason = await ais_safe_image(content, ext)
     if not is_safe:
         logger.warning(f"Image upload rejected: {reason} (filename: {file.filename})")
         raise HTTPException(
@@ -179,6 +181,10 @@ async def upload_screenshot(
     async with aiofiles.open(filepath, 'wb') as f:
         await f.write(content)
     
+    # Precompress text-based images so static serving never compresses them
+    if ext in PRECOMPRESS_EXTENSIONS:
+        await asyncio.to_thread(write_precompressed, filepath, content)
+    
     logger.info(f"Screenshot uploaded: {unique_filename} ({filesize} bytes)")
     
     # Return URL (relative to the uploads directory)
@@ -10,10 +10,13 @@ Handles incoming webhooks from Paddle for:
 - subscription.resumed
 """
 import os
+import asyncio
 import hmac
 import hashlib
 import json
+from collections import OrderedDict
 from datetime import datetime
+from types import MappingProxyType
 from typing import Optional
 
 from fastapi import APIRouter, Request, Header, HTTPException, status
@@ -26,28 +29,96 @@ router = APIRouter()
 # Environment variable for webhook secret
 PADDLE_WEBHOOK_SECRET = os.getenv("PADDLE_WEBHOOK_SECRET", "")
 
+# Bodies larger than this are parsed in a worker thread so CPU-bound JSON
+# decoding does not stall the event loop
+OFFLOAD_BODY_THRESHOLD = 8192
+
+# Upper bound on accepted webhook bodies (Paddle payloads are a few KiB)
+MAX_WEBHOOK_BODY_SIZE = 1024 * 1024
+
+# Bounded LRU of recently processed Paddle event IDs, used to short-circuit
+# retried deliveries before they hit the database
+SEEN_EVENTS_MAX = 4096
+_seen_events: "OrderedDict[str, None]" = OrderedDict()
+
 # Price ID to Plan mapping (Paddle Price ID -> Database Plan Enum)
 # Update these IDs to match your Paddle dashboard
-PRICE_TO_PLAN = {
+PRICE_TO_PLAN = MappingProxyType({
     "pri_01kb5da0e4hwhrynm8tf1a8atg": "PRO",      # Pro Plan - $49/mo
     "pri_01kb5djzbeyaev2k64nzkayfbx": "PRO",      # Pro Plan (alternate ID)
     "pri_01kb5dphg35030j7e9crrcqxd8": "AGENCY",   # Agency Plan - $149/mo
-}
+})
 
 # Price ID to Credit amount mapping (for one-time purchases)
 # Update these IDs to match your Paddle dashboard
-PRICE_TO_CREDITS = {
+PRICE_TO_CREDITS = MappingProxyType({
     "pri_01kb5dww39pc83mag1x8dtrzyw": 500,        # Starter Pack - $15
     "pri_01kb5e09hfcpdpzxvxmzg3c179": 2000,       # Pro Pack - $50
     "pri_01kb5e09hfcpdpzvxvnmzg3c179": 2000,      # Pro Pack (alternate ID)
-}
+})
 
 # Plan to monthly credits mapping
-PLAN_CREDITS = {
+PLAN_CREDITS = MappingProxyType({
     "FREE": 10,
     "PRO": 500,
     "AGENCY": 2000,
-}
+})
+
+
+def _plan_credits(plan: str) -> int:
+    """Monthly credits for a plan, falling back to the FREE allowance."""
+    return PLAN_CREDITS.get(plan, PLAN_CREDITS["FREE"])
+
+
+def parse_paddle_signature(signature: Optional[str]) -> Optional[tuple[str, str]]:
+    """
+    Parse the Paddle-Signature header (format: ts=timestamp;h1=hash).
+    
+    Returns (timestamp, expected_hash), or None if the header is missing or malformed.
+    """
+    if not signature:
+        print("❌ ERROR: No Paddle-Signature header provided")
+        return None
+    
+    try:
+        parts = dict(part.split("=") for part in signature.split(";"))
+    except ValueError as e:
+        print(f"❌ ERROR: Signature verification failed: {e}")
+        return None
+    
+    timestamp = parts.get("ts", "")
+    expected_hash = parts.get("h1", "")
+    
+    if not timestamp or not expected_hash:
+        print("❌ ERROR: Invalid signature format")
+        return None
+    
+    return timestamp, expected_hash
+
+
+def new_signature_mac(secret: str, timestamp: str) -> "hmac.HMAC":
+    """
+    Create an HMAC-SHA256 primed with the signed-payload prefix (timestamp + ":").
+    
+    The request body is fed into the returned object with update(), which lets
+    the webhook handler hash the body incrementally as it streams in.
+    """
+    mac = hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha256)
+    mac.update(f"{timestamp}:".encode('utf-8'))
+    return mac
+
+
+def signature_matches(mac: "hmac.HMAC", expected_hash: str) -> bool:
+    """Compare a fully-fed signature HMAC against the hash from the header."""
+    calculated_hash = mac.hexdigest()
+    is_valid = hmac.compare_digest(calculated_hash, expected_hash)
+    
+    if not is_valid:
+        print(f"❌ ERROR: Signature mismatch")
+        print(f"  Expected: {expected_hash}")
+        print(f"  Calculated: {calculated_hash}")
+    
+    return is_valid
 
 
 def verify_paddle_signature(
@@ -67,43 +138,14 @@ def verify_paddle_signature(
         print("⚠️ WARN: PADDLE_WEBHOOK_SECRET not set, skipping signature verification")
         return True
     
-    if not signature:
-        print("❌ ERROR: No Paddle-Signature header provided")
+    parsed = parse_paddle_signature(signature)
+    if parsed is None:
         return False
     
-    try:
-        # Parse the signature header (format: ts=timestamp;h1=hash)
-        parts = dict(part.split("=") for part in signature.split(";"))
-        timestamp = parts.get("ts", "")
-        expected_hash = parts.get("h1", "")
-        
-        if not timestamp or not expected_hash:
-            print("❌ ERROR: Invalid signature format")
-            return False
-        
-        # Build the signed payload: timestamp:body
-        signed_payload = f"{timestamp}:{payload.decode('utf-8')}"
-        
-        # Calculate HMAC-SHA256
-        calculated_hash = hmac.new(
-            secret.encode('utf-8'),
-            signed_payload.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        
-        # Compare signatures
-        is_valid = hmac.compare_digest(calculated_hash, expected_hash)
-        
-        if not is_valid:
-            print(f"❌ ERROR: Signature mismatch")
-            print(f"  Expected: {expected_hash}")
-            print(f"  Calculated: {calculated_hash}")
-        
-        return is_valid
-        
-    except Exception as e:
-        print(f"❌ ERROR: Signature verification failed: {e}")
-        return False
+    timestamp, expected_hash = parsed
+    mac = new_signature_mac(secret, timestamp)
+    mac.update(payload)
+    return signature_matches(mac, expected_hash)
 
 
 @router.post("/paddle")
@@ -122,22 +164,45 @@ async def handle_paddle_webhook(
     - subscription.paused: Subscription paused
     - subscription.resumed: Subscription resumed
     """
-    # Get raw body for signature verification
-    body = await request.body()
+    invalid_signature = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid webhook signature"
+    )
     
     # Verify signature (skip in development if no secret)
+    mac = None
+    expected_hash = ""
     if PADDLE_WEBHOOK_SECRET:
-        if not verify_paddle_signature(body, paddle_signature, PADDLE_WEBHOOK_SECRET):
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid webhook signature"
-            )
+        parsed = parse_paddle_signature(paddle_signature)
+        if parsed is None:
+            raise invalid_signature
+        timestamp, expected_hash = parsed
+        mac = new_signature_mac(PADDLE_WEBHOOK_SECRET, timestamp)
     else:
         print("⚠️ WARN: Webhook signature verification skipped (no secret configured)")
     
+    # Stream the raw body, hashing each chunk as it arrives so verification
+    # completes together with the last byte
+    buffer = bytearray()
+    async for chunk in request.stream():
+        buffer.extend(chunk)
+        if len(buffer) > MAX_WEBHOOK_BODY_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Webhook payload too large"
+            )
+        if mac is not None:
+            mac.update(chunk)
+    body = bytes(buffer)
+    
+    if mac is not None and not signature_matches(mac, expected_hash):
+        raise invalid_signature
+    
+    offload = len(body) > OFFLOAD_BODY_THRESHOLD
+    
     # Parse the webhook payload
     try:
-        payload = json.loads(body)
+        payload = await asyncio.to_thread(json.loads, body) if offload else json.loads(body)
     except json.JSONDecodeError as e:
         print(f"❌ ERROR: Failed to parse webhook payload: {e}")
         raise HTTPException(
@@ -148,31 +213,30 @@ async def handle_paddle_webhook(
     event_type = payload.get("event_type", "")
     data = payload.get("data", {})
     
+    event_id = payload.get("event_id")
+    if event_id:
+        if event_id in _seen_events:
+            _seen_events.move_to_end(event_id)
+            print(f"🔁 Skipping duplicate Paddle webhook: {event_id}")
+            return {"status": "duplicate", "event_type": event_type}
+        _seen_events[event_id] = None
+        if len(_seen_events) > SEEN_EVENTS_MAX:
+            _seen_events.popitem(last=False)
+    
     print(f"📨 Received Paddle webhook: {event_type}")
-    print(f"📦 Payload: {json.dumps(payload, indent=2)}")
+    if offload:
+        # Pretty-printing costs as much as the parse that was just offloaded
+        print(f"📦 Payload: {len(body)} bytes (event {event_id})")
+    else:
+        print(f"📦 Payload: {json.dumps(payload, indent=2)}")
     
     try:
         # Route to appropriate handler based on event type
-        if event_type == "transaction.completed":
-            await handle_transaction_completed(data)
-        
-        elif event_type == "subscription.created":
-            await handle_subscription_created(data)
-        
-        elif event_type == "subscription.updated":
-            await handle_subscription_updated(data)
-        
-        elif event_type == "subscription.canceled":
-            await handle_subscription_canceled(data)
-        
-        elif event_type == "subscription.paused":
-            await handle_subscription_paused(data)
-        
-        elif event_type == "subscription.resumed":
-            await handle_subscription_resumed(data)
-        
-        else:
+        handler = EVENT_HANDLERS.get(event_type)
+        if handler is None:
             print(f"⚠️ WARN: Unhandled event type: {event_type}")
+        else:
+            await handler(data)
         
         return {"status": "success", "event_type": event_type}
     
@@ -231,7 +295,7 @@ async def handle_transaction_completed(data: dict):
                     "subscriptionStatus": "active",
                     "subscriptionId": data.get("subscription_id"),
                     "paddleCustomerId": data.get("customer_id"),
-                    "creditBalance": PLAN_CREDITS.get(new_plan, 10),
+                    "creditBalance": _plan_credits(new_plan),
                 }
             )
             print(f"  ✅ Successfully upgraded organization {org_id} to {new_plan}")
@@ -337,23 +401,24 @@ async def handle_subscription_updated(data: dict):
     print(f"  Status: {status}")
     print(f"  Plan: {plan}")
     
-    # Find organization by subscription ID
-    org = await db.organization.find_first(
-        where={"subscriptionId": subscription_id}
+    update_data = {"subscriptionStatus": status}
+    
+    if plan:
+        update_data["plan"] = plan
+        update_data["creditBalance"] = _plan_credits(plan)
+    
+    if not subscription_id:
+        print("  ⚠️ WARN: Event has no subscription ID, ignoring")
+        return
+    
+    # Single UPDATE ... WHERE subscriptionId = ? instead of find_first + update
+    count = await db.organization.update_many(
+        where={"subscriptionId": subscription_id},
+        data=update_data
     )
     
-    if org:
-        update_data = {"subscriptionStatus": status}
-        
-        if plan:
-            update_data["plan"] = plan
-            update_data["creditBalance"] = PLAN_CREDITS.get(plan, 10)
-        
-        await db.organization.update(
-            where={"id": org.id},
-            data=update_data
-        )
-        print(f"  ✅ Updated organization {org.id}")
+    if count:
+        print(f"  ✅ Updated organization for subscription {subscription_id}")
     else:
         print(f"  ⚠️ No organization found for subscription {subscription_id}")
 
@@ -370,21 +435,21 @@ async def handle_subscription_canceled(data: dict):
     
     print(f"  Subscription ID: {subscription_id}")
     
-    # Find organization by subscription ID
-    org = await db.organization.find_first(
-        where={"subscriptionId": subscription_id}
+    if not subscription_id:
+        print("  ⚠️ WARN: Event has no subscription ID, ignoring")
+        return
+    
+    count = await db.organization.update_many(
+        where={"subscriptionId": subscription_id},
+        data={
+            "subscriptionStatus": "canceled",
+            "plan": "FREE",
+            "creditBalance": PLAN_CREDITS["FREE"],
+        }
     )
     
-    if org:
-        await db.organization.update(
-            where={"id": org.id},
-            data={
-                "subscriptionStatus": "canceled",
-                "plan": "FREE",
-                "creditBalance": PLAN_CREDITS["FREE"],
-            }
-        )
-        print(f"  ✅ Canceled subscription for organization {org.id}")
+    if count:
+        print(f"  ✅ Canceled subscription {subscription_id}")
     else:
         print(f"  ⚠️ No organization found for subscription {subscription_id}")
 
@@ -397,16 +462,19 @@ async def handle_subscription_paused(data: dict):
     
     subscription_id = data.get("id")
     
-    org = await db.organization.find_first(
-        where={"subscriptionId": subscription_id}
+    if not subscription_id:
+        print("  ⚠️ WARN: Event has no subscription ID, ignoring")
+        return
+    
+    count = await db.organization.update_many(
+        where={"subscriptionId": subscription_id},
+        data={"subscriptionStatus": "paused"}
     )
     
-    if org:
-        await db.organization.update(
-            where={"id": org.id},
-            data={"subscriptionStatus": "paused"}
-        )
-        print(f"  ✅ Paused subscription for organization {org.id}")
+    if count:
+        print(f"  ✅ Paused subscription {subscription_id}")
+    else:
+        print(f"  ⚠️ No organization found for subscription {subscription_id}")
 
 
 async def handle_subscription_resumed(data: dict):
@@ -417,16 +485,30 @@ async def handle_subscription_resumed(data: dict):
     
     subscription_id = data.get("id")
     
-    org = await db.organization.find_first(
-        where={"subscriptionId": subscription_id}
+    if not subscription_id:
+        print("  ⚠️ WARN: Event has no subscription ID, ignoring")
+        return
+    
+    count = await db.organization.update_many(
+        where={"subscriptionId": subscription_id},
+        data={"subscriptionStatus": "active"}
     )
     
-    if org:
-        await db.organization.update(
-            where={"id": org.id},
-            data={"subscriptionStatus": "active"}
-        )
-        print(f"  ✅ Resumed subscription for organization {org.id}")
+    if count:
+        print(f"  ✅ Resumed subscription {subscription_id}")
+    else:
+        print(f"  ⚠️ No organization found for subscription {subscription_id}")
+
+
+# Event type -> handler dispatch table used by handle_paddle_webhook
+EVENT_HANDLERS = MappingProxyType({
+    "transaction.completed": handle_transaction_completed,
+    "subscription.created": handle_subscription_created,
+    "subscription.updated": handle_subscription_updated,
+    "subscription.canceled": handle_subscription_canceled,
+    "subscription.paused": handle_subscription_paused,
+    "subscription.resumed": handle_subscription_resumed,
+})
 
 
 # ============== Helper Functions ==============
@@ -470,18 +552,18 @@ async def add_credits_by_customer_id(customer_id: str, credits: int):
     
     SECURITY: Uses Prisma's atomic increment to prevent race conditions.
     """
-    # Find organization by customer ID
-    org = await db.organization.find_first(
-        where={"paddleCustomerId": customer_id}
+    if not customer_id:
+        print("  ⚠️ WARN: No customer ID, cannot add credits")
+        return
+    
+    # Single atomic UPDATE ... SET creditBalance = creditBalance + ? WHERE paddleCustomerId = ?
+    count = await db.organization.update_many(
+        where={"paddleCustomerId": customer_id},
+        data={"creditBalance": {"increment": credits}}
     )
     
-    if org:
-        # Use atomic increment
-        updated_org = await db.organization.update(
-            where={"id": org.id},
-            data={"creditBalance": {"increment": credits}}
-        )
-        print(f"  ✅ Added {credits} credits to organization {org.id}. New balance: {updated_org.creditBalance}")
+    if count:
+        print(f"  ✅ Added {credits} credits for customer {customer_id}")
         return
     
     print(f"  ⚠️ No organization found for customer {customer_id}")
@@ -501,7 +583,7 @@ async def activate_subscription(
             "subscriptionStatus": "active",
             "subscriptionId": subscription_id,
             "paddleCustomerId": customer_id,
-            "creditBalance": PLAN_CREDITS.get(plan, 10),
+            "creditBalance": _plan_credits(plan),
         }
     )
     print(f"  ✅ Activated {plan} subscription for organization {org_id}")
@@ -524,7 +606,7 @@ async def activate_subscription_by_customer_id(
                 "plan": plan,
                 "subscriptionStatus": "active",
                 "subscriptionId": subscription_id,
-                "creditBalance": PLAN_CREDITS.get(plan, 10),
+                "creditBalance": _plan_credits(plan),
             }
         )
         print(f"  ✅ Activated {plan} subscription for organization {org.id} (by customer ID)")
@@ -89,6 +89,54 @@ class ClerkTokenVerifier:
         
         return self._jwks_client
     
+    def _decode(self, token: str, key: Any) -> Dict[str, Any]:
+        """Verify the token's signature and claims against a signing key."""
+        verify_options = {
+            "verify_signature": True,
+            "verify_exp": True,
+            "verify_nbf": True,
+            "verify_iat": True,
+            "require": ["exp", "iat", "sub"],
+        }
+        return jwt.decode(
+            token,
+            key,
+            algorithms=["RS256"],
+            issuer=self.issuer_url,
+            options=verify_options,
+        )
+    
+    def verify_token_with_cached_keys(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify a Clerk JWT using only the JWKS keys already held in memory.
+        
+        Unlike verify_token this never fetches or resets the key set, so it
+        is safe for unauthenticated traffic such as rate limiting: a token
+        with an unknown `kid` is simply rejected. Returns None until
+        verify_token has loaded the keys.
+        """
+        if not token:
+            return None
+        
+        if self.skip_verification:
+            return self.verify_token(token)
+        
+        jwks_client = self._jwks_client
+        if jwks_client is None or jwks_client.jwk_set_cache is None:
+            return None
+        jwk_set = jwks_client.jwk_set_cache.get()
+        if jwk_set is None:
+            return None
+        
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            for signing_key in jwk_set.keys:
+                if signing_key.key_id == kid:
+                    return self._decode(token, signing_key.key)
+        except jwt.PyJWTError:
+            pass
+        return None
+    
     def verify_token(self, token: str) -> Optional[Dict[str, Any]]:
         """
         Verify a Clerk JWT token and return the decoded claims.
@@ -126,23 +174,8 @@ class ClerkTokenVerifier:
             # Get the signing key from the token header
             signing_key = jwks_client.get_signing_key_from_jwt(token)
             
-            # Build verification options
-            verify_options = {
-                "verify_signature": True,
-                "verify_exp": True,
-                "verify_nbf": True,
-                "verify_iat": True,
-                "require": ["exp", "iat", "sub"],
-            }
-            
             # Verify and decode the token
-            decoded = jwt.decode(
-                token,
-                signing_key.key,
-                algorithms=["RS256"],
-                issuer=self.issuer_url,
-                options=verify_options,
-            )
+            decoded = self._decode(token, signing_key.key)
             
             logger.debug(f"✅ Token verified successfully for user: {decoded.get('sub')}")
             return decoded
@@ -203,3 +236,11 @@ def verify_clerk_token(token: str) -> Optional[Dict[str, Any]]:
     """
     return get_clerk_verifier().verify_token(token)
 
+
+def verify_clerk_token_with_cached_keys(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verify a Clerk token against already-loaded JWKS keys only (no network).
+    
+    See ClerkTokenVerifier.verify_token_with_cached_keys.
+    """
+    return get_clerk_verifier().verify_token_with_cached_keys(token)
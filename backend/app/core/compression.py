@@ -0,0 +1,194 @@
+"""
+Response Compression
+
+Provides:
+- CompressionMiddleware: zstd for clients that accept it, gzip otherwise
+- PrecompressedStaticFiles: serves `<file>.zst` siblings written at upload
+  time, so static assets are never compressed on the request path
+"""
+import logging
+import stat
+from mimetypes import guess_type
+
+import anyio
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+# zstd level for dynamic responses - comparable ratio to gzip -9 at a
+# fraction of the CPU cost
+ZSTD_RESPONSE_LEVEL = 3
+
+# zstd level for precompressed static files (paid once, at upload time)
+ZSTD_STATIC_LEVEL = 19
+
+# Upload extensions worth precompressing; raster formats are already compressed
+PRECOMPRESS_EXTENSIONS = frozenset({"svg"})
+
+PRECOMPRESSED_SUFFIX = ".zst"
+
+
+def _accepts_zstd(headers: Headers) -> bool:
+    return "zstd" in headers.get("accept-encoding", "")
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with zstd when the client advertises it, falling back
+    to gzip. Drop-in replacement for Starlette's GZipMiddleware.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        gzip_level: int = 9,
+        zstd_level: int = ZSTD_RESPONSE_LEVEL,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            if _accepts_zstd(headers):
+                responder = ZstdResponder(self.app, self.minimum_size, self.zstd_level)
+                await responder(scope, receive, send)
+                return
+            if "gzip" in headers.get("accept-encoding", ""):
+                responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class ZstdResponder:
+    """
+    Mirrors Starlette's GZipResponder using a zstd compression object.
+    Streaming chunks are flushed per message so streamed responses stay live.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int, level: int = ZSTD_RESPONSE_LEVEL) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.send: Send = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.content_encoding_set = False
+        self.compressor = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_zstd)
+
+    def _compressobj(self):
+        if self.compressor is None:
+            self.compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        return self.compressor
+
+    def _set_encoding_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = "zstd"
+        headers.add_vary_header("Accept-Encoding")
+        return headers
+
+    async def send_with_zstd(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Hold the initial message until we know how to rewrite its headers
+            self.initial_message = message
+            headers = Headers(raw=self.initial_message["headers"])
+            self.content_encoding_set = "content-encoding" in headers
+        elif message_type == "http.response.body" and self.content_encoding_set:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+        elif message_type == "http.response.body" and not self.started:
+            self.started = True
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(body) < self.minimum_size and not more_body:
+                # Don't compress small outgoing responses
+                await self.send(self.initial_message)
+                await self.send(message)
+            elif not more_body:
+                # Whole response in one message
+                body = zstandard.ZstdCompressor(level=self.level).compress(body)
+                headers = self._set_encoding_headers()
+                headers["Content-Length"] = str(len(body))
+                message["body"] = body
+
+                await self.send(self.initial_message)
+                await self.send(message)
+            else:
+                # First chunk of a streaming response
+                headers = self._set_encoding_headers()
+                del headers["Content-Length"]
+
+                compressor = self._compressobj()
+                message["body"] = compressor.compress(body) + compressor.flush(
+                    zstandard.COMPRESSOBJ_FLUSH_BLOCK
+                )
+
+                await self.send(self.initial_message)
+                await self.send(message)
+        elif message_type == "http.response.body":
+            # Remaining chunks of a streaming response
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            compressor = self._compressobj()
+            if more_body:
+                message["body"] = compressor.compress(body) + compressor.flush(
+                    zstandard.COMPRESSOBJ_FLUSH_BLOCK
+                )
+            else:
+                message["body"] = compressor.compress(body) + compressor.flush()
+
+            await self.send(message)
+
+
+def write_precompressed(filepath: str, content: bytes) -> None:
+    """
+    Write a zstd-compressed sibling (`<filepath>.zst`) for a static upload.
+
+    Blocking; call via asyncio.to_thread from request handlers.
+    """
+    compressed = zstandard.ZstdCompressor(level=ZSTD_STATIC_LEVEL).compress(content)
+    if len(compressed) >= len(content):
+        return
+    with open(filepath + PRECOMPRESSED_SUFFIX, "wb") as f:
+        f.write(compressed)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves a precompressed `.zst` sibling when the client
+    accepts zstd, avoiding any compression work on the request path.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if _accepts_zstd(Headers(scope=scope)):
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_path, path + PRECOMPRESSED_SUFFIX
+            )
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                response = self.file_response(full_path, stat_result, scope)
+                response.headers["Content-Encoding"] = "zstd"
+                response.headers["Content-Type"] = guess_type(path)[0] or "application/octet-stream"
+                response.headers.add_vary_header("Accept-Encoding")
+                return response
+
+        response = await super().get_response(path, scope)
+        response.headers.add_vary_header("Accept-Encoding")
+        return response
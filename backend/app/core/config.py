@@ -2,6 +2,7 @@
 Configuration management for dual-mode deployment
 """
 import warnings
+from functools import lru_cache
 from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import model_validator
@@ -14,7 +15,8 @@ class Settings(BaseSettings):
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False,
-        extra="ignore"
+        extra="ignore",
+        frozen=True,
     )
     
     # Deployment mode
@@ -38,13 +40,16 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     
+    # Field encryption key derivation (changing this re-keys all encrypted fields)
+    ENCRYPTION_KDF: Literal["pbkdf2", "scrypt"] = "pbkdf2"
+    
     # License validation (desktop mode)
     LICENSE_VALIDATION_URL: str = "https://api.example.com/validate"
     LICENSE_PUBLIC_KEY: str = ""  # RSA public key for license verification
     GRACE_PERIOD_DAYS: int = 30
     
     # CORS
-    CORS_ORIGINS: list[str] = ["http://localhost", "http://localhost:80", "http://localhost:3000", "http://localhost:5173", "http://127.0.0.1", "http://127.0.0.1:80"]
+    CORS_ORIGINS: tuple[str, ...] = ("http://localhost", "http://localhost:80", "http://localhost:3000", "http://localhost:5173", "http://127.0.0.1", "http://127.0.0.1:80")
     
     # File storage
     UPLOAD_DIR: str = "./uploads"
@@ -118,5 +123,14 @@ class Settings(BaseSettings):
         return self
 
 
-# Global settings instance
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings, parsing the environment on first use."""
+    return Settings()
+
+
+def __getattr__(name: str):
+    """Build the global `settings` instance lazily on first access."""
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
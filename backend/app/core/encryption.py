@@ -21,6 +21,7 @@ Usage:
 """
 import os
 import base64
+import hashlib
 import logging
 from typing import Optional
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
@@ -37,6 +38,18 @@ NONCE_SIZE = 12  # 96 bits for GCM
 KEY_SIZE = 32    # 256 bits for AES-256
 SALT_SIZE = 16   # 128 bits for key derivation
 
+# Marker prefixed to base64 ciphertexts to identify encrypted fields
+_ENC_PREFIX = "$enc$"
+_ENC_PREFIX_LEN = len(_ENC_PREFIX)
+
+# Version tag prefixed to raw-bytes ciphertexts (see encrypt_bytes)
+BYTES_FORMAT_V1 = b'\x01'
+
+# scrypt cost parameters (RFC 7914 interactive-login recommendation)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
 
 class FieldEncryption:
     """
@@ -45,27 +58,49 @@ class FieldEncryption:
     SECURITY: 
     - Uses authenticated encryption (GCM mode) to prevent tampering
     - Unique nonce per encryption for semantic security
-    - Key derived from SECRET_KEY using PBKDF2
+    - Key derived from SECRET_KEY using PBKDF2 (or scrypt, see ENCRYPTION_KDF)
     """
     
-    def __init__(self, secret_key: Optional[str] = None):
+    def __init__(self, secret_key: Optional[str] = None, kdf: Optional[str] = None):
         """
         Initialize with a secret key.
         
+        The key is derived immediately so the KDF cost is paid at startup
+        rather than on the first request that touches an encrypted field.
+        
         Args:
             secret_key: Base secret key (defaults to settings.SECRET_KEY)
+            kdf: Key derivation function, "pbkdf2" or "scrypt"
+                 (defaults to settings.ENCRYPTION_KDF)
         """
         self._secret_key = secret_key or settings.SECRET_KEY
+        self._kdf = kdf or settings.ENCRYPTION_KDF
         self._encryption_key: Optional[bytes] = None
         self._salt: Optional[bytes] = None
+        self._aesgcm: Optional[AESGCM] = None
+        self._get_encryption_key()
     
     def _derive_key(self, salt: bytes) -> bytes:
         """
-        Derive an encryption key from the secret using PBKDF2.
+        Derive an encryption key from the secret using PBKDF2 or scrypt.
         
         SECURITY: PBKDF2 with high iteration count makes brute force attacks
-        computationally expensive.
+        computationally expensive. scrypt (OpenSSL-backed via hashlib) adds
+        memory hardness at a lower CPU cost per derivation.
         """
+        if self._kdf == "scrypt":
+            return hashlib.scrypt(
+                self._secret_key.encode(),
+                salt=salt,
+                n=SCRYPT_N,
+                r=SCRYPT_R,
+                p=SCRYPT_P,
+                dklen=KEY_SIZE,
+            )
+        
+        if self._kdf != "pbkdf2":
+            raise ValueError(f"Unsupported key derivation function: {self._kdf}")
+        
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
             length=KEY_SIZE,
@@ -87,9 +122,25 @@ class FieldEncryption:
             # This ensures the same key is derived each time
             self._salt = self._secret_key[:SALT_SIZE].encode().ljust(SALT_SIZE, b'\x00')
             self._encryption_key = self._derive_key(self._salt)
+            self._aesgcm = AESGCM(self._encryption_key)
         
         return self._encryption_key, self._salt
     
+    def warm(self) -> None:
+        """Ensure the encryption key is derived (no-op once cached)."""
+        self._get_encryption_key()
+    
+    def _seal(self, nonce: bytes, plaintext: str) -> str:
+        """Encrypt with the cached cipher and return the prefixed base64 token."""
+        # Encrypt (GCM mode provides authentication)
+        ciphertext = self._aesgcm.encrypt(nonce, plaintext.encode('utf-8'), None)
+        
+        # Combine nonce + ciphertext and encode as base64
+        encrypted = base64.b64encode(nonce + ciphertext).decode('utf-8')
+        
+        # Prefix with marker to identify encrypted fields
+        return _ENC_PREFIX + encrypted
+    
     def encrypt(self, plaintext: str) -> str:
         """
         Encrypt a string value.
@@ -107,20 +158,33 @@ class FieldEncryption:
             return plaintext
         
         try:
-            key, _ = self._get_encryption_key()
-            aesgcm = AESGCM(key)
-            
             # Generate unique nonce for this encryption
-            nonce = os.urandom(NONCE_SIZE)
+            return self._seal(os.urandom(NONCE_SIZE), plaintext)
             
-            # Encrypt (GCM mode provides authentication)
-            ciphertext = aesgcm.encrypt(nonce, plaintext.encode('utf-8'), None)
-            
-            # Combine nonce + ciphertext and encode as base64
-            encrypted = base64.b64encode(nonce + ciphertext).decode('utf-8')
+        except Exception as e:
+            logger.error(f"Encryption failed: {e}")
+            raise ValueError("Failed to encrypt data")
+    
+    def encrypt_many(self, plaintexts: list[str]) -> list[str]:
+        """
+        Encrypt several string values in one call.
+        
+        All nonces are drawn from a single os.urandom() call and sliced per
+        value; empty values are passed through unchanged, as with encrypt().
+        
+        Args:
+            plaintexts: The strings to encrypt
             
-            # Prefix with marker to identify encrypted fields
-            return f"$enc${encrypted}"
+        Returns:
+            Encrypted values in the same order as the input
+        """
+        try:
+            nonces = os.urandom(NONCE_SIZE * len(plaintexts))
+            return [
+                self._seal(nonces[i * NONCE_SIZE:(i + 1) * NONCE_SIZE], plaintext)
+                if plaintext else plaintext
+                for i, plaintext in enumerate(plaintexts)
+            ]
             
         except Exception as e:
             logger.error(f"Encryption failed: {e}")
@@ -142,25 +206,65 @@ class FieldEncryption:
         if not ciphertext:
             return ciphertext
         
+        # Raw-bytes ciphertexts (from encrypt_bytes) are dispatched on their version tag
+        if isinstance(ciphertext, (bytes, bytearray, memoryview)):
+            return self.decrypt_bytes(ciphertext)
+        
         # Check if this is an encrypted field
-        if not ciphertext.startswith("$enc$"):
+        if not ciphertext.startswith(_ENC_PREFIX):
             # Not encrypted, return as-is (backwards compatibility)
             return ciphertext
         
         try:
-            key, _ = self._get_encryption_key()
-            aesgcm = AESGCM(key)
-            
             # Remove prefix and decode
-            encrypted_data = base64.b64decode(ciphertext[5:])  # Skip "$enc$"
+            encrypted_data = memoryview(base64.b64decode(ciphertext[_ENC_PREFIX_LEN:]))
             
-            # Split nonce and ciphertext
+            # Split nonce and ciphertext (zero-copy views)
             nonce = encrypted_data[:NONCE_SIZE]
             actual_ciphertext = encrypted_data[NONCE_SIZE:]
             
             # Decrypt (GCM verifies authentication tag)
-            plaintext = aesgcm.decrypt(nonce, actual_ciphertext, None)
+            plaintext = self._aesgcm.decrypt(nonce, actual_ciphertext, None)
+            
+            return plaintext.decode('utf-8')
+            
+        except Exception as e:
+            logger.error(f"Decryption failed: {e}")
+            raise ValueError("Failed to decrypt data - data may be corrupted or tampered")
+    
+    def encrypt_bytes(self, plaintext: str) -> bytes:
+        """
+        Encrypt a string value into raw bytes for binary (BYTEA/BLOB) columns.
+        
+        Skips the base64 step of encrypt(), so the stored value is 25% smaller
+        and needs no encode/decode pass.
+        
+        Returns:
+            Version tag + nonce + ciphertext
+        """
+        try:
+            nonce = os.urandom(NONCE_SIZE)
+            ciphertext = self._aesgcm.encrypt(nonce, plaintext.encode('utf-8'), None)
+            return BYTES_FORMAT_V1 + nonce + ciphertext
             
+        except Exception as e:
+            logger.error(f"Encryption failed: {e}")
+            raise ValueError("Failed to encrypt data")
+    
+    def decrypt_bytes(self, data: bytes) -> str:
+        """
+        Decrypt a raw-bytes value produced by encrypt_bytes().
+        
+        Raises:
+            ValueError: If the version tag is unknown or decryption fails
+        """
+        if data[:1] != BYTES_FORMAT_V1:
+            raise ValueError("Unsupported encrypted data format")
+        
+        try:
+            view = memoryview(data)
+            nonce = view[1:1 + NONCE_SIZE]
+            plaintext = self._aesgcm.decrypt(nonce, view[1 + NONCE_SIZE:], None)
             return plaintext.decode('utf-8')
             
         except Exception as e:
@@ -168,8 +272,10 @@ class FieldEncryption:
             raise ValueError("Failed to decrypt data - data may be corrupted or tampered")
     
     def is_encrypted(self, value: str) -> bool:
-        """Check if a value is encrypted (has $enc$ prefix)."""
-        return value is not None and value.startswith("$enc$")
+        """Check if a value is encrypted ($enc$ prefix, or raw bytes with a version tag)."""
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return value[:1] == BYTES_FORMAT_V1
+        return value is not None and value.startswith(_ENC_PREFIX)
 
 
 # Global instance
@@ -184,6 +290,17 @@ def get_field_encryption() -> FieldEncryption:
     return _field_encryption
 
 
+def warm_field_encryption() -> None:
+    """
+    Derive the global field-encryption key ahead of the first request.
+    
+    Call from the parent process of a pre-forking server (e.g. gunicorn
+    --preload) so workers inherit the derived key copy-on-write instead of
+    each running the KDF.
+    """
+    get_field_encryption().warm()
+
+
 def encrypt_field(value: str) -> str:
     """
     Encrypt a field value.
@@ -204,6 +321,16 @@ def decrypt_field(value: str) -> str:
     return get_field_encryption().decrypt(value)
 
 
+def encrypt_field_bytes(value: str) -> bytes:
+    """
+    Encrypt a field value for storage in a binary column.
+    
+    Usage:
+        encrypted_notes = encrypt_field_bytes(notes)
+    """
+    return get_field_encryption().encrypt_bytes(value)
+
+
 def is_encrypted(value: str) -> bool:
     """Check if a value is encrypted."""
     return get_field_encryption().is_encrypted(value)
@@ -225,9 +352,10 @@ class EncryptedFieldMixin:
     def encrypt_sensitive_fields(self) -> dict:
         """Return dict with sensitive fields encrypted."""
         data = self.model_dump() if hasattr(self, 'model_dump') else self.dict()
-        for field in self._encrypted_fields:
-            if field in data and data[field]:
-                data[field] = encrypt_field(data[field])
+        fields = [field for field in self._encrypted_fields if field in data and data[field]]
+        if fields:
+            encrypted = get_field_encryption().encrypt_many([data[field] for field in fields])
+            data.update(zip(fields, encrypted))
         return data
     
     @classmethod
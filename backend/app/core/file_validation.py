@@ -10,15 +10,23 @@ Example attack prevented:
 - Extension check passes (it ends in .png)
 - Magic byte check fails (content doesn't start with PNG signature)
 """
+import asyncio
+import hashlib
 import logging
+import re
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
 from typing import Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 
-# Magic byte signatures for common file types
+# Magic byte signatures for common file types. This and the lookup tables
+# derived from it are read-only views: they are built once at import (in the
+# parent process under a pre-forking server) and never mutated afterwards.
 # Format: (extension, mime_type, magic_bytes, offset)
-MAGIC_SIGNATURES = {
+MAGIC_SIGNATURES = MappingProxyType({
     # Images
     "png": {
         "mime": "image/png",
@@ -29,21 +37,13 @@ MAGIC_SIGNATURES = {
     "jpg": {
         "mime": "image/jpeg",
         "signatures": [
-            (b'\xff\xd8\xff\xe0', 0),  # JPEG JFIF
-            (b'\xff\xd8\xff\xe1', 0),  # JPEG EXIF
-            (b'\xff\xd8\xff\xe8', 0),  # JPEG SPIFF
-            (b'\xff\xd8\xff\xdb', 0),  # JPEG raw
-            (b'\xff\xd8\xff\xee', 0),  # JPEG (Adobe)
+            (b'\xff\xd8\xff', 0),  # JPEG SOI + marker (marker byte checked separately)
         ]
     },
     "jpeg": {
         "mime": "image/jpeg",
         "signatures": [
-            (b'\xff\xd8\xff\xe0', 0),
-            (b'\xff\xd8\xff\xe1', 0),
-            (b'\xff\xd8\xff\xe8', 0),
-            (b'\xff\xd8\xff\xdb', 0),
-            (b'\xff\xd8\xff\xee', 0),
+            (b'\xff\xd8\xff', 0),
         ]
     },
     "gif": {
@@ -100,7 +100,126 @@ MAGIC_SIGNATURES = {
         "mime": "text/plain",
         "signatures": []  # No specific signature for text files
     },
-}
+})
+
+
+def _is_webp(content: bytes) -> bool:
+    """WebP files are RIFF containers with 'WEBP' at offset 8."""
+    return len(content) >= 12 and content[8:12] == b'WEBP'
+
+
+def _is_jpeg(content: bytes) -> bool:
+    """JPEG SOI must be followed by an APPn (E0-EF) or quantization table (DB) marker."""
+    return len(content) >= 4 and (0xE0 <= content[3] <= 0xEF or content[3] == 0xDB)
+
+
+# Extra checks for formats whose leading signature alone is not conclusive
+SIGNATURE_POST_CHECKS = MappingProxyType({
+    "webp": _is_webp,
+    "jpg": _is_jpeg,
+    "jpeg": _is_jpeg,
+})
+
+
+# Length of the header prefix used to index PREFIX_TABLE. Every signature in
+# MAGIC_SIGNATURES sits at offset 0 and is at least this long, and the first
+# two bytes are enough to tell the signature families apart.
+PREFIX_LENGTH = 2
+
+
+def _build_prefix_table() -> dict:
+    """
+    Index every signature by its leading bytes.
+    
+    Returns a dict mapping a PREFIX_LENGTH-byte prefix to a tuple of
+    (extension, signatures, post_check) candidates, kept in MAGIC_SIGNATURES order
+    so detection precedence is unchanged. A signature shared by several
+    extensions is kept only for the first one (the one detection would
+    report), and consecutive signatures of the same extension are merged so
+    they are tested with a single bytes.startswith() call.
+    """
+    table: dict = {}
+    seen = set()
+    for ext, info in MAGIC_SIGNATURES.items():
+        for signature, offset in info.get("signatures", []):
+            if offset != 0 or len(signature) < PREFIX_LENGTH:
+                raise ValueError(f"Signature for '{ext}' cannot be prefix-indexed")
+            if signature in seen:
+                continue
+            seen.add(signature)
+            candidates = table.setdefault(signature[:PREFIX_LENGTH], [])
+            if candidates and candidates[-1][0] == ext:
+                candidates[-1][1].append(signature)
+            else:
+                candidates.append((ext, [signature], SIGNATURE_POST_CHECKS.get(ext)))
+    return {
+        prefix: tuple((ext, tuple(signatures), check) for ext, signatures, check in candidates)
+        for prefix, candidates in table.items()
+    }
+
+
+# Prefix -> candidate signatures, so a header is matched with one dict lookup
+# instead of scanning every extension's signature list.
+PREFIX_TABLE = MappingProxyType(_build_prefix_table())
+
+# Extension -> (signatures, mime, post_check), flattened once so validating a
+# claimed extension is one dict lookup plus a single bytes.startswith() call
+# over all of its signatures.
+EXTENSION_TABLE = MappingProxyType({
+    ext: (
+        tuple(signature for signature, _ in info.get("signatures", [])),
+        info["mime"],
+        SIGNATURE_POST_CHECKS.get(ext),
+    )
+    for ext, info in MAGIC_SIGNATURES.items()
+})
+
+
+# Bytes of a file inspected by header validation: enough for every magic-byte
+# signature, the WebP marker at offset 8, and the TXT null-byte check.
+MAGIC_HEADER_SIZE = 4096
+
+# Payloads above this size are validated in a worker thread by the async
+# helpers; smaller ones are cheaper to check inline than to hand off.
+OFFLOAD_VALIDATION_THRESHOLD = 64 * 1024
+
+# Content that can execute script when an SVG is rendered. Matched on the raw
+# bytes in a single pass, so the upload never needs decoding or lowercasing.
+_SVG_DANGEROUS = re.compile(
+    rb'<script|javascript:|onerror\s*=|onload\s*=|onclick\s*=|<foreignobject',
+    re.IGNORECASE,
+)
+
+# Upper bound on how much SVG markup is scanned per upload. Larger SVGs are
+# rejected outright rather than partially scanned, so a payload can never be
+# hidden past the inspected window.
+SVG_MAX_SCAN_BYTES = 1024 * 1024
+
+
+# LRU of SVG scan results keyed by SHA-256 of the content. Retried and
+# re-submitted uploads skip the pattern scan, which costs far more than the
+# (hardware-accelerated) hash. Accessed from worker threads, hence the lock.
+SVG_SCAN_CACHE_SIZE = 1024
+_svg_scan_cache: "OrderedDict[bytes, Optional[str]]" = OrderedDict()
+_svg_scan_cache_lock = threading.Lock()
+
+
+def _scan_svg(content: bytes) -> Optional[str]:
+    """Return the first dangerous pattern found in an SVG, or None."""
+    digest = hashlib.sha256(content).digest()
+    with _svg_scan_cache_lock:
+        if digest in _svg_scan_cache:
+            _svg_scan_cache.move_to_end(digest)
+            return _svg_scan_cache[digest]
+    
+    match = _SVG_DANGEROUS.search(content)
+    pattern = match.group(0).decode('ascii', errors='ignore').lower() if match else None
+    
+    with _svg_scan_cache_lock:
+        _svg_scan_cache[digest] = pattern
+        if len(_svg_scan_cache) > SVG_SCAN_CACHE_SIZE:
+            _svg_scan_cache.popitem(last=False)
+    return pattern
 
 
 def get_magic_bytes(content: bytes, length: int = 16) -> bytes:
@@ -125,46 +244,55 @@ def validate_magic_bytes(
     SECURITY: This prevents extension spoofing attacks where malicious
     files are uploaded with innocent extensions.
     """
+    return validate_header(content[:MAGIC_HEADER_SIZE], claimed_extension)
+
+
+def validate_header(
+    header: bytes,
+    claimed_extension: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Validate the leading bytes of a file against its claimed extension.
+    
+    Only the first MAGIC_HEADER_SIZE bytes are ever inspected, so callers
+    can validate an upload from its header before reading the rest.
+    
+    Returns:
+        (is_valid: bool, detected_type: Optional[str])
+    """
     ext = claimed_extension.lower().lstrip('.')
     
     # Get signature info for this extension
-    sig_info = MAGIC_SIGNATURES.get(ext)
+    entry = EXTENSION_TABLE.get(ext)
     
-    if not sig_info:
+    if not entry:
         # Unknown extension - deny by default for security
         logger.warning(f"Unknown file extension: {ext}")
         return False, None
     
-    signatures = sig_info.get("signatures", [])
+    signatures, mime, post_check = entry
     
     # Text files don't have magic bytes - allow with basic checks
     if not signatures:
         if ext == "txt":
             # Check for null bytes (binary data)
-            if b'\x00' in content[:1024]:
+            if header.find(b'\x00', 0, 1024) != -1:
                 logger.warning("TXT file contains binary data (null bytes)")
                 return False, None
             return True, "text/plain"
         return False, None
     
-    # Check content against known signatures
-    for signature, offset in signatures:
-        if len(content) >= offset + len(signature):
-            if content[offset:offset + len(signature)] == signature:
-                # Special handling for WebP (needs additional check)
-                if ext == "webp":
-                    if len(content) >= 12 and content[8:12] == b'WEBP':
-                        return True, sig_info["mime"]
-                    continue
-                
-                return True, sig_info["mime"]
+    # Check content against every signature for this extension in one call;
+    # WebP/JPEG need an additional check
+    if header.startswith(signatures) and (post_check is None or post_check(header)):
+        return True, mime
     
     # No signature matched
     logger.warning(f"Magic bytes don't match claimed extension '{ext}'")
-    logger.debug(f"Content starts with: {content[:16].hex()}")
+    logger.debug(f"Content starts with: {header[:16].hex()}")
     
     # Try to detect actual file type
-    detected = detect_file_type(content)
+    detected = detect_file_type(header)
     if detected:
         logger.warning(f"File appears to be '{detected}' but was uploaded as '{ext}'")
     
@@ -177,15 +305,10 @@ def detect_file_type(content: bytes) -> Optional[str]:
     
     Returns the detected file extension or None if unknown.
     """
-    for ext, info in MAGIC_SIGNATURES.items():
-        for signature, offset in info.get("signatures", []):
-            if len(content) >= offset + len(signature):
-                if content[offset:offset + len(signature)] == signature:
-                    # Special WebP check
-                    if ext == "webp":
-                        if len(content) >= 12 and content[8:12] != b'WEBP':
-                            continue
-                    return ext
+    for ext, signatures, post_check in PREFIX_TABLE.get(content[:PREFIX_LENGTH], ()):
+        # Special WebP/JPEG check via post_check
+        if content.startswith(signatures) and (post_check is None or post_check(content)):
+            return ext
     
     return None
 
@@ -214,19 +337,17 @@ def is_safe_image(content: bytes, claimed_extension: str) -> Tuple[bool, str]:
     
     # Additional SVG security checks (SVGs can contain scripts)
     if ext == "svg":
+        # Bound the scan: refuse SVGs too large to inspect in full
+        if len(content) > SVG_MAX_SCAN_BYTES:
+            logger.warning(
+                f"SVG of {len(content)} bytes exceeds scan limit of {SVG_MAX_SCAN_BYTES} bytes"
+            )
+            return False, "SVG is too large to inspect safely"
+        
         # Check for dangerous content in SVG
-        content_str = content.decode('utf-8', errors='ignore').lower()
-        dangerous_patterns = [
-            '<script',
-            'javascript:',
-            'onerror=',
-            'onload=',
-            'onclick=',
-            '<foreignobject',
-        ]
-        for pattern in dangerous_patterns:
-            if pattern in content_str:
-                return False, f"SVG contains potentially dangerous content: {pattern}"
+        pattern = _scan_svg(content)
+        if pattern:
+            return False, f"SVG contains potentially dangerous content: {pattern}"
     
     return True, "OK"
 
@@ -267,3 +388,30 @@ def validate_upload(
     
     return True, "OK"
 
+
+async def ais_safe_image(content: bytes, claimed_extension: str) -> Tuple[bool, str]:
+    """
+    Async variant of is_safe_image for use from request handlers.
+    
+    Large payloads are checked in a worker thread so the SVG scan does not
+    block the event loop.
+    """
+    if len(content) > OFFLOAD_VALIDATION_THRESHOLD:
+        return await asyncio.to_thread(is_safe_image, content, claimed_extension)
+    return is_safe_image(content, claimed_extension)
+
+
+async def avalidate_upload(
+    content: bytes,
+    filename: str,
+    allowed_extensions: set
+) -> Tuple[bool, str]:
+    """
+    Async variant of validate_upload for use from request handlers.
+    
+    Large payloads are checked in a worker thread so validation does not
+    block the event loop.
+    """
+    if len(content) > OFFLOAD_VALIDATION_THRESHOLD:
+        return await asyncio.to_thread(validate_upload, content, filename, allowed_extensions)
+    return validate_upload(content, filename, allowed_extensions)
@@ -6,15 +6,22 @@ or in-memory storage (desktop mode).
 
 SECURITY: Prevents brute force attacks, API abuse, and DoS attempts.
 """
+import asyncio
+import hashlib
+import math
+import re
 import time
 import logging
-from typing import Dict, Optional, Callable
-from collections import defaultdict
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Dict, Optional, Callable, Tuple
 from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from app.core.clerk_auth import verify_clerk_token_with_cached_keys
 from app.core.config import settings
+from app.core.security import decode_token
 
 logger = logging.getLogger(__name__)
 
@@ -22,24 +29,31 @@ logger = logging.getLogger(__name__)
 class InMemoryRateLimiter:
     """
     Simple in-memory rate limiter for desktop mode.
-    Uses a sliding window algorithm.
+    Uses an approximated sliding window.
+    
+    Each key stores (window, current_count, previous_count) for fixed
+    one-minute windows. The previous window's count is weighted by how much
+    of it still overlaps the sliding minute, which tracks a true sliding
+    window closely while keeping two integers per key instead of one
+    timestamp per request.
     """
     def __init__(self):
-        self.requests: Dict[str, list] = defaultdict(list)
+        self.buckets: Dict[str, Tuple[int, int, int]] = {}
+        self.window_size = 60  # 1 minute
         self.cleanup_interval = 60  # seconds
-        self.last_cleanup = time.time()
+        self.last_cleanup = time.monotonic()
     
     def _cleanup(self):
-        """Remove old request timestamps"""
-        now = time.time()
+        """Remove keys whose current and previous windows have both expired"""
+        now = time.monotonic()
         if now - self.last_cleanup < self.cleanup_interval:
             return
         
-        cutoff = now - 60  # 1 minute window
-        for key in list(self.requests.keys()):
-            self.requests[key] = [t for t in self.requests[key] if t > cutoff]
-            if not self.requests[key]:
-                del self.requests[key]
+        oldest_live = int(now // self.window_size) - 1
+        self.buckets = {
+            key: bucket for key, bucket in self.buckets.items()
+            if bucket[0] >= oldest_live
+        }
         
         self.last_cleanup = now
     
@@ -52,30 +66,58 @@ class InMemoryRateLimiter:
         """
         self._cleanup()
         
-        now = time.time()
-        window_start = now - 60  # 1 minute window
+        now = time.monotonic()
+        window, elapsed = divmod(now, self.window_size)
+        window = int(window)
         
-        # Filter to only requests in current window
-        self.requests[key] = [t for t in self.requests[key] if t > window_start]
+        stored_window, current, previous = self.buckets.get(key, (window, 0, 0))
+        if stored_window != window:
+            # Roll over; the old count only carries if it was the previous window
+            previous = current if stored_window == window - 1 else 0
+            current = 0
         
-        current_count = len(self.requests[key])
-        remaining = max(0, limit - current_count)
+        effective = previous * (1 - elapsed / self.window_size) + current
         
-        if current_count >= limit:
-            return False, remaining
+        if effective >= limit:
+            self.buckets[key] = (window, current, previous)
+            return False, 0
         
-        self.requests[key].append(now)
-        return True, remaining - 1
+        self.buckets[key] = (window, current + 1, previous)
+        return True, max(0, limit - math.ceil(effective) - 1)
+
+
+# Atomic check-and-increment over the current and previous one-minute
+# buckets. Denied requests perform no writes, and the whole decision costs a
+# single round trip.
+#   KEYS[1] = current bucket, KEYS[2] = previous bucket
+#   ARGV[1] = limit, ARGV[2] = previous-bucket weight, ARGV[3] = bucket TTL
+RATE_LIMIT_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local weight = tonumber(ARGV[2])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local effective = previous * weight + current
+if effective >= limit then
+    return {0, 0}
+end
+if redis.call('INCR', KEYS[1]) == 1 then
+    redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+end
+return {1, math.max(0, limit - math.ceil(effective) - 1)}
+"""
 
 
 class RedisRateLimiter:
     """
     Redis-based rate limiter for docker/production mode.
-    Uses sorted sets for efficient sliding window.
+    Uses the same weighted two-bucket window as InMemoryRateLimiter, with
+    one INCR counter per key per minute evaluated by a server-side script.
     """
     def __init__(self, redis_client):
         self.redis = redis_client
         self.window_size = 60  # 1 minute
+        # register_script runs EVALSHA and reloads the script on NOSCRIPT
+        self._script = redis_client.register_script(RATE_LIMIT_SCRIPT)
     
     async def is_allowed(self, key: str, limit: int) -> tuple[bool, int]:
         """
@@ -84,32 +126,18 @@ class RedisRateLimiter:
         Returns:
             (allowed: bool, remaining: int)
         """
-        now = time.time()
-        window_start = now - self.window_size
-        
-        pipe = self.redis.pipeline()
-        
-        # Remove old entries
-        pipe.zremrangebyscore(key, 0, window_start)
+        window, elapsed = divmod(time.time(), self.window_size)
+        window = int(window)
+        weight = 1 - elapsed / self.window_size
         
-        # Count current requests
-        pipe.zcard(key)
+        # Hash-tag the key so both buckets land in the same cluster slot
+        keys = [f"{{{key}}}:{window}", f"{{{key}}}:{window - 1}"]
+        allowed, remaining = await self._script(
+            keys=keys,
+            args=[limit, weight, self.window_size * 2],
+        )
         
-        # Add current request
-        pipe.zadd(key, {str(now): now})
-        
-        # Set expiry on the key
-        pipe.expire(key, self.window_size + 1)
-        
-        results = await pipe.execute()
-        current_count = results[1]
-        
-        remaining = max(0, limit - current_count)
-        
-        if current_count >= limit:
-            return False, remaining
-        
-        return True, remaining
+        return bool(allowed), int(remaining)
 
 
 # Global in-memory limiter instance
@@ -137,14 +165,16 @@ def get_rate_limiter():
 
 def get_client_ip(request: Request) -> str:
     """Extract client IP from request, handling proxies."""
+    headers = request.headers
+    
     # Check X-Forwarded-For header (set by nginx/proxies)
-    forwarded_for = request.headers.get("X-Forwarded-For")
+    forwarded_for = headers.get("x-forwarded-for")
     if forwarded_for:
         # Get the first IP (original client)
         return forwarded_for.split(",")[0].strip()
     
     # Check X-Real-IP header
-    real_ip = request.headers.get("X-Real-IP")
+    real_ip = headers.get("x-real-ip")
     if real_ip:
         return real_ip
     
@@ -155,8 +185,83 @@ def get_client_ip(request: Request) -> str:
     return "unknown"
 
 
+# Verified bearer token -> (subject, expiry), so each token's signature is
+# checked once rather than on every request it is presented with. Only
+# verified tokens are stored, so junk tokens cannot evict real subjects.
+TOKEN_SUBJECT_CACHE_SIZE = 1024
+_token_subjects: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+
+def _verify_token_subject(token: str) -> Optional[Tuple[str, float]]:
+    """
+    Verify a bearer token and return (subject, expiry), or None.
+    
+    Same order as get_current_user (legacy JWT, then Clerk), but Clerk tokens
+    are only checked against JWKS keys already in memory: the middleware runs
+    before any limit applies, so it must never trigger a key fetch.
+    """
+    claims = decode_token(token) or verify_clerk_token_with_cached_keys(token)
+    if claims and claims.get("sub"):
+        return str(claims["sub"]), float(claims.get("exp") or time.time() + 60)
+    return None
+
+
+async def get_verified_user_id(request: Request) -> str:
+    """
+    Return the subject of the request's bearer token if its signature
+    verifies, otherwise an empty string.
+    
+    SECURITY: Only cryptographically verified tokens are trusted, so clients
+    cannot pick their own rate-limit identity.
+    """
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return ""
+    
+    cached = _token_subjects.get(token)
+    if cached is not None:
+        subject, expires_at = cached
+        if expires_at > time.time():
+            _token_subjects.move_to_end(token)
+            return subject
+        del _token_subjects[token]
+    
+    # Signature checks are CPU work; keep them off the event loop
+    verified = await asyncio.to_thread(_verify_token_subject, token)
+    if verified is None:
+        return ""
+    
+    _token_subjects[token] = verified
+    if len(_token_subjects) > TOKEN_SUBJECT_CACHE_SIZE:
+        _token_subjects.popitem(last=False)
+    return verified[0]
+
+
+# Path segments that identify a resource (UUIDs, cuids, numeric IDs): any
+# segment of 8+ ID characters containing a digit, or a purely numeric one
+_ID_SEGMENT_RE = re.compile(r"/(?:(?=[A-Za-z_-]*\d)[A-Za-z0-9_-]{8,}|\d+)(?=/|$)")
+
+
+def get_path_bucket(path: str) -> str:
+    """
+    Collapse resource IDs in a path (`/api/findings/<id>` ->
+    `/api/findings/:id`) so every resource behind one route shares a limit.
+    """
+    return _ID_SEGMENT_RE.sub("/:id", path)
+
+
+def make_rate_key(client_ip: str, user_id: str, path: str) -> str:
+    """
+    Build a compact, fixed-width rate-limit key from the client identity and
+    the path bucket.
+    """
+    identity = "%s|%s|%s" % (client_ip, user_id, get_path_bucket(path))
+    return "rl:" + hashlib.blake2b(identity.encode(), digest_size=8).hexdigest()
+
+
 # Rate limit configurations for different endpoints
-RATE_LIMITS = {
+RATE_LIMITS = MappingProxyType({
     # Sensitive operations - stricter limits
     "/api/auth/": 20,        # Auth endpoints: 20 req/min
     "/api/uploads/": 30,     # File uploads: 30 req/min
@@ -165,21 +270,48 @@ RATE_LIMITS = {
     
     # Standard API - default limits
     "default": settings.RATE_LIMIT_PER_MINUTE,  # 60 req/min
-}
+})
+
+
+# One anchored alternation over every prefix, one capture group per prefix in
+# RATE_LIMITS order; the matching group's index selects the limit.
+_LIMITED_PREFIXES = tuple(prefix for prefix in RATE_LIMITS if prefix != "default")
+_PATH_LIMIT_RE = re.compile("|".join(f"({re.escape(prefix)})" for prefix in _LIMITED_PREFIXES))
+_PATH_LIMITS = tuple(RATE_LIMITS[prefix] for prefix in _LIMITED_PREFIXES)
 
 
 def get_rate_limit_for_path(path: str) -> int:
     """Get the appropriate rate limit for a given path."""
-    for prefix, limit in RATE_LIMITS.items():
-        if prefix != "default" and path.startswith(prefix):
-            return limit
+    match = _PATH_LIMIT_RE.match(path)
+    if match:
+        return _PATH_LIMITS[match.lastindex - 1]
     return RATE_LIMITS["default"]
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+# Paths to exclude from rate limiting
+EXCLUDED_EXACT = frozenset({
+    "/",
+    "/health",
+    "/api/docs",
+    "/api/redoc",
+    "/api/openapi.json",
+})
+
+# Path prefixes to exclude from rate limiting (static files)
+EXCLUDED_PREFIXES = ("/uploads/",)
+
+# Pre-encoded 429 body, shared by every rejected request
+RATE_LIMIT_EXCEEDED_BODY = b'{"detail": "Rate limit exceeded. Please try again later."}'
+
+
+class RateLimitMiddleware:
     """
     FastAPI middleware for rate limiting.
     
+    Implemented as pure ASGI middleware: unlike BaseHTTPMiddleware it does
+    not route every response through an extra task group and memory stream,
+    it only rewrites the response start message to add rate-limit headers.
+    
     SECURITY: Protects against:
     - Brute force authentication attacks
     - API abuse and scraping
@@ -187,33 +319,32 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     - Resource exhaustion
     """
     
-    # Paths to exclude from rate limiting
-    EXCLUDED_PATHS = {
-        "/",
-        "/health",
-        "/api/docs",
-        "/api/redoc",
-        "/api/openapi.json",
-    }
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Skip rate limiting for excluded paths
-        if request.url.path in self.EXCLUDED_PATHS:
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        path = scope["path"]
         
-        # Skip static files
-        if request.url.path.startswith("/uploads/"):
-            return await call_next(request)
+        # Skip rate limiting for excluded paths and static files
+        if path in EXCLUDED_EXACT or path.startswith(EXCLUDED_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        
+        request = Request(scope)
         
         # Get client identifier
         client_ip = get_client_ip(request)
         
         # Include user ID if authenticated (for per-user limits)
-        user_id = request.headers.get("X-User-ID", "")
-        rate_key = f"rate_limit:{client_ip}:{user_id}:{request.url.path}"
+        user_id = await get_verified_user_id(request)
+        rate_key = make_rate_key(client_ip, user_id, path)
         
         # Get appropriate rate limit
-        limit = get_rate_limit_for_path(request.url.path)
+        limit = get_rate_limit_for_path(path)
         
         # Check rate limit
         limiter = get_rate_limiter()
@@ -224,7 +355,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             allowed, remaining = limiter.is_allowed(rate_key, limit)
         
         if not allowed:
-            logger.warning(f"Rate limit exceeded for {client_ip} on {request.url.path}")
+            logger.warning(f"Rate limit exceeded for {client_ip} on {path}")
             
             # Log rate limit event to audit log (async, fire-and-forget)
             try:
@@ -232,7 +363,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 import asyncio
                 asyncio.create_task(
                     audit_service.log_rate_limited(
-                        endpoint=request.url.path,
+                        endpoint=path,
                         ip_address=client_ip,
                         user_id=user_id if user_id else None,
                     )
@@ -240,8 +371,8 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             except Exception as e:
                 logger.debug(f"Failed to log rate limit to audit: {e}")
             
-            return Response(
-                content='{"detail": "Rate limit exceeded. Please try again later."}',
+            response = Response(
+                content=RATE_LIMIT_EXCEEDED_BODY,
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 headers={
                     "Content-Type": "application/json",
@@ -251,15 +382,21 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                 },
                 media_type="application/json"
             )
+            await response(scope, receive, send)
+            return
         
-        # Process request
-        response = await call_next(request)
+        rate_limit_headers = [
+            (b"x-ratelimit-limit", str(limit).encode("latin-1")),
+            (b"x-ratelimit-remaining", str(remaining).encode("latin-1")),
+        ]
         
-        # Add rate limit headers to response
-        response.headers["X-RateLimit-Limit"] = str(limit)
-        response.headers["X-RateLimit-Remaining"] = str(remaining)
+        async def send_with_headers(message: Message) -> None:
+            # Add rate limit headers to response
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *rate_limit_headers]
+            await send(message)
         
-        return response
+        await self.app(scope, receive, send_with_headers)
 
 
 def rate_limit(limit: int = None):
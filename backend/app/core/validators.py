@@ -20,19 +20,23 @@ MAX_PHONE_LENGTH = 50
 
 
 # Regex patterns
+# Email, phone and UUID formats are ASCII-only, so those patterns are
+# compiled with re.ASCII to skip Unicode class lookups while matching.
 EMAIL_PATTERN = re.compile(
-    r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$',
+    re.ASCII
 )
 
 # Phone pattern - allows international formats
 PHONE_PATTERN = re.compile(
-    r'^[\d\s\-\+\(\)\.]+$'
+    r'^[\d\s\-\+\(\)\.]+$',
+    re.ASCII
 )
 
 # UUID pattern
 UUID_PATTERN = re.compile(
     r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$',
-    re.IGNORECASE
+    re.IGNORECASE | re.ASCII
 )
 
 # Safe text pattern - alphanumeric, spaces, and common punctuation
@@ -41,12 +45,23 @@ SAFE_TEXT_PATTERN = re.compile(
     re.UNICODE
 )
 
-# URL pattern - basic validation
+# URL pattern - basic validation. Anchoring on http(s):// also rules out
+# javascript: and data: URLs (XSS).
 URL_PATTERN = re.compile(
     r'^https?://[^\s<>"{}|\\^`\[\]]+$',
     re.IGNORECASE
 )
 
+# Bound match methods for the validators below
+_email_match = EMAIL_PATTERN.match
+_phone_match = PHONE_PATTERN.match
+_uuid_match = UUID_PATTERN.match
+_url_match = URL_PATTERN.match
+
+# Any Unicode whitespace (e.g. the no-break space in pasted numbers); phone
+# numbers are normalised with this before the ASCII-only PHONE_PATTERN check
+_UNICODE_SPACE_RE = re.compile(r'\s')
+
 
 def sanitize_string(value: str, max_length: int = MAX_SHORT_TEXT_LENGTH) -> str:
     """
@@ -59,17 +74,9 @@ def sanitize_string(value: str, max_length: int = MAX_SHORT_TEXT_LENGTH) -> str:
     if not value:
         return value
     
-    # Remove null bytes (can break database/queries)
-    value = value.replace('\x00', '')
-    
-    # Strip whitespace
-    value = value.strip()
-    
-    # Truncate
-    if len(value) > max_length:
-        value = value[:max_length]
-    
-    return value
+    # Remove null bytes (can break database/queries), strip whitespace, truncate.
+    # Each step hands back the same object when it has nothing to change.
+    return value.replace('\x00', '').strip()[:max_length]
 
 
 def validate_email(email: str) -> str:
@@ -79,7 +86,7 @@ def validate_email(email: str) -> str:
     
     email = sanitize_string(email, MAX_EMAIL_LENGTH).lower()
     
-    if not EMAIL_PATTERN.match(email):
+    if not _email_match(email):
         raise ValueError("Invalid email address format")
     
     return email
@@ -91,8 +98,10 @@ def validate_phone(phone: str) -> str:
         return phone
     
     phone = sanitize_string(phone, MAX_PHONE_LENGTH)
+    if not phone.isascii():
+        phone = _UNICODE_SPACE_RE.sub(' ', phone)
     
-    if not PHONE_PATTERN.match(phone):
+    if not _phone_match(phone):
         raise ValueError("Invalid phone number format")
     
     return phone
@@ -105,7 +114,7 @@ def validate_uuid(uuid_str: str) -> str:
     
     uuid_str = sanitize_string(uuid_str, 36).lower()
     
-    if not UUID_PATTERN.match(uuid_str):
+    if not _uuid_match(uuid_str):
         raise ValueError("Invalid UUID format")
     
     return uuid_str
@@ -118,14 +127,9 @@ def validate_url(url: str) -> str:
     
     url = sanitize_string(url, MAX_URL_LENGTH)
     
-    if not URL_PATTERN.match(url):
+    if not _url_match(url):
         raise ValueError("Invalid URL format")
     
-    # Prevent javascript: and data: URLs (XSS)
-    url_lower = url.lower()
-    if url_lower.startswith('javascript:') or url_lower.startswith('data:'):
-        raise ValueError("URL scheme not allowed")
-    
     return url
 
 
@@ -180,12 +184,10 @@ def validate_filename(filename: str) -> str:
     
     filename = sanitize_string(filename, 255)
     
-    # Remove path separators (prevents path traversal)
+    # Remove path separators (prevents path traversal); sanitize_string has
+    # already removed null bytes
     filename = filename.replace('/', '').replace('\\', '')
     
-    # Remove null bytes
-    filename = filename.replace('\x00', '')
-    
     # Check for empty filename after sanitization
     if not filename or filename in ('.', '..'):
         raise ValueError("Invalid filename")
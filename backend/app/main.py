@@ -11,12 +11,12 @@ SECURITY: This application includes multiple security layers:
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from prisma import Prisma
 
+from app.core.compression import CompressionMiddleware, PrecompressedStaticFiles
 from app.core.config import settings
+from app.core.encryption import warm_field_encryption
 from app.core.rate_limit import RateLimitMiddleware
 from app.core.security_middleware import (
     SecurityHeadersMiddleware,
@@ -24,6 +24,8 @@ from app.core.security_middleware import (
     RequestContextMiddleware,
 )
 from app.db import db
+from app.services.ai_service import ai_service
+from app.services.pdf_service import pdf_service
 from app.api.routes import auth, clients, projects, findings, reports, templates, uploads, billing, webhooks, orgs, ai, imports, admin
 
 
@@ -34,9 +36,21 @@ async def lifespan(app: FastAPI):
     await db.connect()
     yield
     # Shutdown
+    await ai_service.aclose()
+    await pdf_service.close()
     await db.disconnect()
 
 
+# Everything built at import time - the field-encryption key below, and the
+# magic-byte, rate-limit and validator tables and compiled regexes in
+# app.core - is built once in the parent when served with a pre-forking
+# server, and inherited by every worker:
+#   gunicorn -k uvicorn.workers.UvicornWorker --preload --workers N app.main:app
+# Derive the field-encryption key here rather than on first use so workers
+# share it instead of each re-running the KDF
+warm_field_encryption()
+
+
 # Create FastAPI application
 app = FastAPI(
     title=settings.APP_NAME,
@@ -47,8 +61,8 @@ app = FastAPI(
 )
 
 # Add middleware (order matters - first added = last executed)
-# GZip compression for responses
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Response compression (zstd when accepted, gzip otherwise)
+app.add_middleware(CompressionMiddleware, minimum_size=1000)
 
 # Security headers (X-Content-Type-Options, X-Frame-Options, etc.)
 app.add_middleware(SecurityHeadersMiddleware)
@@ -89,10 +103,10 @@ app.include_router(ai.router, prefix="/api/v1", tags=["AI"])
 app.include_router(imports.router, prefix="/api/imports", tags=["Imports"])
 app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 
-# Mount static files for uploads
+# Mount static files for uploads (serves precompressed .zst siblings when accepted)
 uploads_dir = Path(settings.UPLOAD_DIR)
 uploads_dir.mkdir(parents=True, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=str(uploads_dir)), name="uploads")
+app.mount("/uploads", PrecompressedStaticFiles(directory=str(uploads_dir)), name="uploads")
 
 
 
@@ -5,15 +5,214 @@ Uses OpenAI GPT models with a structured persona to produce high-quality,
 professional pentest report content.
 """
 import os
+import json
+import time
+import asyncio
+import hashlib
 import logging
-from typing import Optional
-from openai import AsyncOpenAI
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional, Union
+import httpx
+from openai import AsyncOpenAI, DefaultAioHttpClient, DefaultAsyncHttpxClient
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional, falls back to a char estimate
+    tiktoken = None
 
 logger = logging.getLogger(__name__)
 
 # Professional Pentest Persona
 PENTEST_PERSONA = """You are a Senior Penetration Tester writing a final report for a corporate client. Your tone is professional, objective, and technical but accessible. Do not include any conversational filler."""
 
+# Per-task system prompts: persona plus the static instructions. These are
+# plain (non f-) strings so every call sends a byte-identical prefix that
+# OpenAI's automatic prompt caching can reuse; only the trailing user
+# message carries the per-request fields.
+FINDING_SYSTEM_PROMPT = PENTEST_PERSONA + """
+
+Task: Improve and expand the description for the security finding given by the user.
+
+Instructions:
+1. Write a detailed, professional description of the vulnerability.
+2. Explain the potential business impact if exploited.
+3. Provide clear, actionable remediation steps.
+4. Output ONLY the generated text formatted in Markdown. Do not add phrases like "Here is the text"."""
+
+REMEDIATION_SYSTEM_PROMPT = PENTEST_PERSONA + """
+
+Task: Generate detailed remediation steps for the security finding given by the user.
+
+Instructions:
+1. Provide step-by-step remediation instructions.
+2. Include code examples or configuration changes where applicable.
+3. Prioritize actions based on effectiveness and ease of implementation.
+4. Include verification steps to confirm the fix.
+5. Output ONLY the remediation steps in Markdown format."""
+
+EXECUTIVE_SUMMARY_SYSTEM_PROMPT = PENTEST_PERSONA + """
+
+Task: Write an executive summary for a penetration test report from the findings overview given by the user.
+
+Instructions:
+1. Write a concise executive summary suitable for C-level executives.
+2. Highlight the overall security posture and key risks.
+3. Provide high-level recommendations prioritized by business impact.
+4. Keep technical jargon minimal while maintaining accuracy.
+5. Output ONLY the executive summary in Markdown format."""
+
+GRAMMAR_SYSTEM_PROMPT = PENTEST_PERSONA + """
+
+Task: Fix grammar and improve clarity of the text given by the user while maintaining its technical accuracy.
+
+Instructions:
+1. Correct any grammatical errors.
+2. Improve sentence structure for clarity.
+3. Maintain technical terminology and accuracy.
+4. Output ONLY the corrected text without any additional commentary."""
+
+REWRITE_SYSTEM_PROMPT = PENTEST_PERSONA + """
+
+Task: Rewrite the text given by the user to be more professional, objective, and suitable for a formal security assessment report.
+
+Instructions:
+1. Adopt a professional, third-person objective tone.
+2. Remove any colloquialisms, slang, or first-person references.
+3. Ensure the language is precise and concise.
+4. Output ONLY the rewritten text."""
+
+EXPAND_SYSTEM_PROMPT = PENTEST_PERSONA + """
+
+Task: Expand the notes or bullet points given by the user into full, well-structured paragraphs suitable for a security report.
+
+Instructions:
+1. Convert bullet points and shorthand into complete sentences.
+2. Add necessary transition words to improve flow.
+3. Maintain the original technical meaning and facts.
+4. Output ONLY the expanded text."""
+
+TRANSLATE_SYSTEM_PROMPT = PENTEST_PERSONA + """
+
+Task: Translate the security finding content given by the user to the requested target language.
+
+Instructions:
+1. Maintain technical accuracy in the translation.
+2. Use appropriate security terminology in the target language.
+3. Preserve any code snippets or technical identifiers.
+4. Output ONLY the translated text."""
+
+# Canned responses returned when no API key is configured
+MOCK_REMEDIATION_RESPONSE = """## Remediation Steps
+
+1. **Immediate Action**: Apply the security patch or update to the latest version.
+2. **Configuration Update**: Review and harden the affected component's configuration.
+3. **Access Control**: Implement principle of least privilege for affected resources.
+4. **Monitoring**: Enable logging and alerting for suspicious activity.
+
+### Verification
+After implementing the fixes, verify by:
+- Running a follow-up vulnerability scan
+- Reviewing application logs for anomalies
+- Testing the specific attack vector to confirm mitigation"""
+
+MOCK_EXECUTIVE_SUMMARY_RESPONSE = """## Executive Summary
+
+This penetration test assessment identified several security vulnerabilities that require attention. The overall security posture shows room for improvement, particularly in access control and input validation areas.
+
+### Key Recommendations
+1. Address critical and high-severity findings within 30 days
+2. Implement a regular security assessment schedule
+3. Enhance security awareness training for development teams
+4. Review and update security policies and procedures"""
+
+MOCK_FINDING_RESPONSE = """## Vulnerability Description
+
+This vulnerability allows an attacker to potentially compromise the affected system or application. The issue stems from insufficient input validation or improper security controls.
+
+### Business Impact
+If exploited, this vulnerability could lead to:
+- Unauthorized access to sensitive data
+- Disruption of business operations
+- Regulatory compliance violations
+- Reputational damage
+
+### Remediation
+To address this vulnerability:
+1. Apply the recommended security patches
+2. Implement proper input validation
+3. Review access controls and permissions
+4. Enable security monitoring and logging"""
+
+# Connection pool shared by every request from the singleton client, so
+# bursts of generation calls reuse warm TLS connections
+HTTP_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=60.0)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+# Automatic retries for transient API failures before _generate gives up
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+
+# Batch API polling: first delay and ceiling (seconds) for exponential backoff
+BATCH_POLL_INITIAL_DELAY = 5.0
+BATCH_POLL_MAX_DELAY = 60.0
+BATCH_TERMINAL_FAILURES = {"failed", "expired", "cancelled", "cancelling"}
+
+# Completed generations kept for identical (model, max_tokens, prompt) calls
+RESPONSE_CACHE_SIZE = 1024
+
+# Account rate limits enforced client-side; 0 (the default) disables a bucket
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "0"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "0"))
+
+
+class _Limiter:
+    """
+    Token bucket over requests-per-minute and tokens-per-minute.
+    
+    Both capacities refill continuously at rpm/60 and tpm/60 per second.
+    Waiters queue on a lock so capacity is handed out in arrival order.
+    """
+    
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.available_request_capacity = float(rpm)
+        self.available_token_capacity = float(tpm)
+        self.last_update = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.last_update
+        self.last_update = now
+        if self.rpm:
+            self.available_request_capacity = min(
+                self.rpm, self.available_request_capacity + elapsed * self.rpm / 60
+            )
+        if self.tpm:
+            self.available_token_capacity = min(
+                self.tpm, self.available_token_capacity + elapsed * self.tpm / 60
+            )
+    
+    async def acquire(self, tokens: int) -> None:
+        """Wait until one request and `tokens` tokens are available, then take them."""
+        # A request larger than the whole bucket could never be admitted
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._refill()
+                request_short = 1 - self.available_request_capacity if self.rpm else 0
+                token_short = tokens - self.available_token_capacity if self.tpm else 0
+                if request_short <= 0 and token_short <= 0:
+                    break
+                await asyncio.sleep(max(
+                    request_short * 60 / self.rpm if request_short > 0 else 0,
+                    token_short * 60 / self.tpm if token_short > 0 else 0,
+                ))
+            if self.rpm:
+                self.available_request_capacity -= 1
+            if self.tpm:
+                self.available_token_capacity -= tokens
+
 
 class AIService:
     """
@@ -23,6 +222,12 @@ class AIService:
     executive summaries, and other report content using OpenAI's GPT models.
     """
     
+    # Mock response selection, checked in order against the lowercased prompt
+    _MOCK_RESPONSES = (
+        ("remediation", MOCK_REMEDIATION_RESPONSE),
+        ("executive summary", MOCK_EXECUTIVE_SUMMARY_RESPONSE),
+    )
+    
     def __init__(self):
         """Initialize the AI service with OpenAI client."""
         api_key = os.getenv("OPENAI_API_KEY")
@@ -30,9 +235,48 @@ class AIService:
             logger.warning("OPENAI_API_KEY not set. AI features will return mock responses.")
             self.client = None
         else:
-            self.client = AsyncOpenAI(api_key=api_key)
+            self.client = AsyncOpenAI(
+                api_key=api_key,
+                http_client=self._build_http_client(),
+                # The SDK retries 408/409/429/5xx, timeouts and connection
+                # errors with jittered exponential backoff, honoring Retry-After
+                max_retries=OPENAI_MAX_RETRIES,
+            )
         
         self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        
+        # Caps in-flight real-time completions across all concurrent callers
+        self.concurrency = int(os.getenv("OPENAI_CONCURRENCY", "10"))
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        
+        # Shared RPM/TPM budget so fan-out doesn't run into avoidable 429s
+        self._limiter = _Limiter(OPENAI_RPM, OPENAI_TPM) if OPENAI_RPM or OPENAI_TPM else None
+        
+        # LRU of completed generations; re-running grammar fixes or
+        # translations on unchanged text skips the API entirely. Requests are
+        # charged before generation, so paths where users re-run to get a
+        # different answer (rewrite, expand, streaming) bypass it.
+        self._cache: OrderedDict[str, str] = OrderedDict()
+    
+    @staticmethod
+    def _build_http_client():
+        """
+        Build the pooled HTTP client for the OpenAI SDK.
+        
+        Prefers the aiohttp transport, which holds up far better than the
+        default httpx one under many concurrent requests, and falls back to
+        httpx when the openai[aiohttp] extra is not installed.
+        """
+        try:
+            return DefaultAioHttpClient(limits=HTTP_POOL_LIMITS, timeout=HTTP_TIMEOUT)
+        except RuntimeError:
+            logger.info("openai[aiohttp] not installed - using the default httpx transport")
+            return DefaultAsyncHttpxClient(limits=HTTP_POOL_LIMITS, timeout=HTTP_TIMEOUT)
+    
+    async def aclose(self) -> None:
+        """Close the client's pooled connections (called on app shutdown)."""
+        if self.client:
+            await self.client.close()
     
     async def generate_finding_text(
         self,
@@ -53,21 +297,31 @@ class AIService:
         Returns:
             Formatted markdown text with description, impact, and remediation
         """
-        prompt = f"""
-Task: Improve and expand the description for this security finding.
-
-Title: {finding_title}
+        prompt = self._finding_prompt(finding_title, severity, current_description)
+        return await self._generate(prompt, max_tokens, system=FINDING_SYSTEM_PROMPT)
+    
+    def stream_finding_text(
+        self,
+        finding_title: str,
+        severity: str,
+        current_description: Optional[str] = None,
+        max_tokens: int = 1500
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of generate_finding_text for interactive use.
+        
+        Returns:
+            Async iterator of markdown text chunks as the model produces them
+        """
+        prompt = self._finding_prompt(finding_title, severity, current_description)
+        return self._generate_stream(prompt, max_tokens, system=FINDING_SYSTEM_PROMPT, cache=False)
+    
+    @staticmethod
+    def _finding_prompt(finding_title: str, severity: str, current_description: Optional[str]) -> str:
+        return f"""Title: {finding_title}
 Severity: {severity}
 Current Draft: "{current_description or 'N/A'}"
-
-Instructions:
-1. Write a detailed, professional description of the vulnerability.
-2. Explain the potential business impact if exploited.
-3. Provide clear, actionable remediation steps.
-4. Output ONLY the generated text formatted in Markdown. Do not add phrases like "Here is the text".
 """
-        
-        return await self._generate(prompt, max_tokens)
     
     async def generate_remediation(
         self,
@@ -88,22 +342,12 @@ Instructions:
         Returns:
             Formatted markdown remediation steps
         """
-        prompt = f"""
-Task: Generate detailed remediation steps for this security finding.
-
-Title: {finding_title}
+        prompt = f"""Title: {finding_title}
 Severity: {severity}
 Description: {description or 'Not provided'}
-
-Instructions:
-1. Provide step-by-step remediation instructions.
-2. Include code examples or configuration changes where applicable.
-3. Prioritize actions based on effectiveness and ease of implementation.
-4. Include verification steps to confirm the fix.
-5. Output ONLY the remediation steps in Markdown format.
 """
         
-        return await self._generate(prompt, max_tokens)
+        return await self._generate(prompt, max_tokens, system=REMEDIATION_SYSTEM_PROMPT)
     
     async def generate_executive_summary(
         self,
@@ -130,10 +374,7 @@ Instructions:
         Returns:
             Formatted executive summary in markdown
         """
-        prompt = f"""
-Task: Write an executive summary for a penetration test report.
-
-Findings Overview:
+        prompt = f"""Findings Overview:
 - Total Findings: {total_findings}
 - Critical: {critical_count}
 - High: {high_count}
@@ -142,16 +383,9 @@ Findings Overview:
 
 Key Findings Summary:
 {findings_summary}
-
-Instructions:
-1. Write a concise executive summary suitable for C-level executives.
-2. Highlight the overall security posture and key risks.
-3. Provide high-level recommendations prioritized by business impact.
-4. Keep technical jargon minimal while maintaining accuracy.
-5. Output ONLY the executive summary in Markdown format.
 """
         
-        return await self._generate(prompt, max_tokens)
+        return await self._generate(prompt, max_tokens, system=EXECUTIVE_SUMMARY_SYSTEM_PROMPT)
     
     async def fix_grammar(
         self,
@@ -168,19 +402,10 @@ Instructions:
         Returns:
             Corrected text
         """
-        prompt = f"""
-Task: Fix grammar and improve clarity of the following text while maintaining its technical accuracy.
-
-Text: "{text}"
-
-Instructions:
-1. Correct any grammatical errors.
-2. Improve sentence structure for clarity.
-3. Maintain technical terminology and accuracy.
-4. Output ONLY the corrected text without any additional commentary.
+        prompt = f"""Text: "{text}"
 """
         
-        return await self._generate(prompt, max_tokens)
+        return await self._generate(prompt, max_tokens, system=GRAMMAR_SYSTEM_PROMPT)
 
     async def rewrite_text(
         self,
@@ -197,18 +422,9 @@ Instructions:
         Returns:
             Rewritten text
         """
-        prompt = f"""
-Task: Rewrite the following text to be more professional, objective, and suitable for a formal security assessment report.
-
-Text: "{text}"
-
-Instructions:
-1. Adopt a professional, third-person objective tone.
-2. Remove any colloquialisms, slang, or first-person references.
-3. Ensure the language is precise and concise.
-4. Output ONLY the rewritten text.
+        prompt = f"""Text: "{text}"
 """
-        return await self._generate(prompt, max_tokens)
+        return await self._generate(prompt, max_tokens, system=REWRITE_SYSTEM_PROMPT, cache=False)
 
     async def expand_text(
         self,
@@ -225,18 +441,9 @@ Instructions:
         Returns:
             Expanded text
         """
-        prompt = f"""
-Task: Expand the following notes or bullet points into full, well-structured paragraphs suitable for a security report.
-
-Input Text: "{text}"
-
-Instructions:
-1. Convert bullet points and shorthand into complete sentences.
-2. Add necessary transition words to improve flow.
-3. Maintain the original technical meaning and facts.
-4. Output ONLY the expanded text.
+        prompt = f"""Input Text: "{text}"
 """
-        return await self._generate(prompt, max_tokens)
+        return await self._generate(prompt, max_tokens, system=EXPAND_SYSTEM_PROMPT, cache=False)
     
     async def translate_finding(
         self,
@@ -255,27 +462,196 @@ Instructions:
         Returns:
             Translated text
         """
-        prompt = f"""
-Task: Translate the following security finding content to {target_language}.
+        prompt = f"""Target Language: {target_language}
 
 Text: "{text}"
-
-Instructions:
-1. Maintain technical accuracy in the translation.
-2. Use appropriate security terminology in the target language.
-3. Preserve any code snippets or technical identifiers.
-4. Output ONLY the translated text.
 """
         
-        return await self._generate(prompt, max_tokens)
+        return await self._generate(prompt, max_tokens, system=TRANSLATE_SYSTEM_PROMPT)
+    
+    def _chat_request(self, prompt: str, max_tokens: int, system: str = PENTEST_PERSONA) -> dict:
+        """Build the chat completion request body for a prompt."""
+        return {
+            "model": self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": system
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0.7,
+        }
+    
+    async def submit_batch(
+        self,
+        prompts: List[str],
+        system: str,
+        max_tokens: int = 1500
+    ) -> List[str]:
+        """
+        Generate content for many prompts through the OpenAI Batch API.
+        
+        Batch requests are billed at a discount and do not count against the
+        real-time rate limits, but complete asynchronously (within 24h), so
+        this is meant for background work such as pre-generating text for
+        every finding in a report rather than interactive requests.
+        
+        Args:
+            prompts: The user prompts
+            system: The task's system prompt (e.g. FINDING_SYSTEM_PROMPT),
+                shared by every request so they reuse one cached prefix
+            max_tokens: Maximum tokens for each response
+            
+        Returns:
+            Generated text for each prompt, in the same order as `prompts`
+        """
+        if not prompts:
+            return []
+        
+        if not self.client:
+            logger.info("AI batch called without API key - returning mock responses")
+            return [self._get_mock_response(f"{system}\n{prompt}") for prompt in prompts]
+        
+        lines = [
+            json.dumps({
+                "custom_id": str(index),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._chat_request(prompt, max_tokens, system),
+            })
+            for index, prompt in enumerate(prompts)
+        ]
+        
+        try:
+            input_file = await self.client.files.create(
+                file=("batch.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch",
+            )
+            batch = await self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h",
+            )
+            logger.info(f"Submitted AI batch {batch.id} with {len(prompts)} requests")
+            
+            delay = BATCH_POLL_INITIAL_DELAY
+            while batch.status != "completed":
+                if batch.status in BATCH_TERMINAL_FAILURES:
+                    raise RuntimeError(f"batch {batch.id} ended with status '{batch.status}'")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, BATCH_POLL_MAX_DELAY)
+                batch = await self.client.batches.retrieve(batch.id)
+            
+            if not batch.output_file_id:
+                raise RuntimeError(f"batch {batch.id} produced no output")
+            output = await self.client.files.content(batch.output_file_id)
+        except RuntimeError as e:
+            logger.error(f"OpenAI batch error: {str(e)}")
+            raise RuntimeError(f"Failed to generate AI content: {str(e)}")
+        except Exception as e:
+            logger.error(f"OpenAI API error: {str(e)}")
+            raise RuntimeError(f"Failed to generate AI content: {str(e)}")
+        
+        # Output lines arrive in completion order; place them by custom_id
+        results: List[Optional[str]] = [None] * len(prompts)
+        for line in output.text.splitlines():
+            if not line:
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if response.get("status_code") != 200:
+                continue
+            content = response["body"]["choices"][0]["message"]["content"]
+            results[int(record["custom_id"])] = content.strip()
+        
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            logger.error(f"AI batch {batch.id} is missing results for requests {missing}")
+            raise RuntimeError(f"Failed to generate AI content: {len(missing)} batch requests failed")
+        
+        return results
+    
+    async def generate_many(
+        self,
+        prompts: List[str],
+        system: str,
+        max_tokens: int = 1500
+    ) -> List[Union[str, Exception]]:
+        """
+        Generate content for many prompts concurrently.
+        
+        Requests are issued in parallel, bounded by OPENAI_CONCURRENCY
+        in-flight calls, so N prompts take roughly N / concurrency round
+        trips instead of N.
+        
+        Args:
+            prompts: The user prompts
+            system: The task's system prompt (e.g. FINDING_SYSTEM_PROMPT),
+                shared by every request so they reuse one cached prefix
+            max_tokens: Maximum tokens for each response
+            
+        Returns:
+            For each prompt, in order, the generated text or the exception
+            raised while generating it
+        """
+        return await asyncio.gather(
+            *(self._generate(prompt, max_tokens, system=system) for prompt in prompts),
+            return_exceptions=True,
+        )
+    
+    _encodings = {}
+    
+    def _estimate_tokens(self, prompt: str, system: str = PENTEST_PERSONA) -> int:
+        """
+        Estimate the request's token count (system prompt included) for the limiter.
+        
+        Uses the model's tiktoken encoding, cached per model at class scope,
+        and ~4 characters per token when tiktoken or its encoding files are
+        unavailable.
+        """
+        text = system + prompt
+        encoding = self._encodings.get(self.model)
+        if encoding is None and tiktoken is not None and self.model not in self._encodings:
+            try:
+                encoding = tiktoken.encoding_for_model(self.model)
+            except Exception as e:
+                logger.info(f"No tiktoken encoding for {self.model}, estimating tokens: {e}")
+            self._encodings[self.model] = encoding
+        if encoding is None:
+            return len(text) // 4 + 1
+        return len(encoding.encode(text))
     
-    async def _generate(self, prompt: str, max_tokens: int) -> str:
+    def _cache_key(self, prompt: str, max_tokens: int, system: str) -> str:
+        return hashlib.blake2b(
+            f"{self.model}|{max_tokens}|{system}|{prompt}".encode(), digest_size=16
+        ).hexdigest()
+    
+    def _cache_put(self, key: str, content: str) -> None:
+        self._cache[key] = content
+        if len(self._cache) > RESPONSE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+    
+    async def _generate(
+        self,
+        prompt: str,
+        max_tokens: int,
+        system: str = PENTEST_PERSONA,
+        cache: bool = True
+    ) -> str:
         """
         Internal method to generate content using OpenAI API.
         
         Args:
             prompt: The user prompt
             max_tokens: Maximum tokens for the response
+            system: The static system prompt (persona and task instructions)
+            cache: Serve and store the result in the response cache; off
+                for requests where a fresh completion is the point
             
         Returns:
             Generated text content
@@ -283,30 +659,89 @@ Instructions:
         if not self.client:
             # Return a structured mock response when API key is not configured
             logger.info("AI service called without API key - returning mock response")
-            return self._get_mock_response(prompt)
+            return self._get_mock_response(f"{system}\n{prompt}")
+        
+        key = self._cache_key(prompt, max_tokens, system) if cache else None
+        cached = self._cache.get(key) if cache else None
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
         
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": PENTEST_PERSONA
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=max_tokens,
-                temperature=0.7,
-            )
+            async with self._semaphore:
+                if self._limiter:
+                    await self._limiter.acquire(self._estimate_tokens(prompt, system) + max_tokens)
+                response = await self.client.chat.completions.create(
+                    **self._chat_request(prompt, max_tokens, system)
+                )
             
-            return response.choices[0].message.content.strip()
+            content = response.choices[0].message.content.strip()
             
         except Exception as e:
             logger.error(f"OpenAI API error: {str(e)}")
             raise RuntimeError(f"Failed to generate AI content: {str(e)}")
+        
+        if cache:
+            self._cache_put(key, content)
+        return content
+    
+    async def _generate_stream(
+        self,
+        prompt: str,
+        max_tokens: int,
+        system: str = PENTEST_PERSONA,
+        cache: bool = True
+    ) -> AsyncIterator[str]:
+        """
+        Generate content as a stream of text chunks.
+        
+        Same semantics as _generate (mock fallback, response cache, limits),
+        but yields each delta as it arrives so the UI can render before the
+        whole completion is done. The assembled text is cached on success.
+        
+        Args:
+            prompt: The user prompt
+            max_tokens: Maximum tokens for the response
+            system: The static system prompt (persona and task instructions)
+            cache: Serve and store the result in the response cache
+            
+        Yields:
+            Generated text chunks
+        """
+        if not self.client:
+            logger.info("AI service called without API key - returning mock response")
+            yield self._get_mock_response(f"{system}\n{prompt}")
+            return
+        
+        key = self._cache_key(prompt, max_tokens, system) if cache else None
+        cached = self._cache.get(key) if cache else None
+        if cached is not None:
+            self._cache.move_to_end(key)
+            yield cached
+            return
+        
+        parts = []
+        try:
+            async with self._semaphore:
+                if self._limiter:
+                    await self._limiter.acquire(self._estimate_tokens(prompt, system) + max_tokens)
+                response = await self.client.chat.completions.create(
+                    **self._chat_request(prompt, max_tokens, system), stream=True
+                )
+                async for chunk in response:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+        
+        except Exception as e:
+            logger.error(f"OpenAI API error: {str(e)}")
+            raise RuntimeError(f"Failed to generate AI content: {str(e)}")
+        
+        if cache:
+            self._cache_put(key, "".join(parts).strip())
     
     def _get_mock_response(self, prompt: str) -> str:
         """
@@ -318,49 +753,11 @@ Instructions:
         Returns:
             A structured mock response
         """
-        if "remediation" in prompt.lower():
-            return """## Remediation Steps
-
-1. **Immediate Action**: Apply the security patch or update to the latest version.
-2. **Configuration Update**: Review and harden the affected component's configuration.
-3. **Access Control**: Implement principle of least privilege for affected resources.
-4. **Monitoring**: Enable logging and alerting for suspicious activity.
-
-### Verification
-After implementing the fixes, verify by:
-- Running a follow-up vulnerability scan
-- Reviewing application logs for anomalies
-- Testing the specific attack vector to confirm mitigation"""
-        
-        elif "executive summary" in prompt.lower():
-            return """## Executive Summary
-
-This penetration test assessment identified several security vulnerabilities that require attention. The overall security posture shows room for improvement, particularly in access control and input validation areas.
-
-### Key Recommendations
-1. Address critical and high-severity findings within 30 days
-2. Implement a regular security assessment schedule
-3. Enhance security awareness training for development teams
-4. Review and update security policies and procedures"""
-        
-        else:
-            return """## Vulnerability Description
-
-This vulnerability allows an attacker to potentially compromise the affected system or application. The issue stems from insufficient input validation or improper security controls.
-
-### Business Impact
-If exploited, this vulnerability could lead to:
-- Unauthorized access to sensitive data
-- Disruption of business operations
-- Regulatory compliance violations
-- Reputational damage
-
-### Remediation
-To address this vulnerability:
-1. Apply the recommended security patches
-2. Implement proper input validation
-3. Review access controls and permissions
-4. Enable security monitoring and logging"""
+        prompt = prompt.lower()
+        for keyword, response in self._MOCK_RESPONSES:
+            if keyword in prompt:
+                return response
+        return MOCK_FINDING_RESPONSE
 
 
 # Singleton instance
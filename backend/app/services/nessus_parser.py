@@ -17,17 +17,21 @@ Nessus XML Structure:
   </Report>
 </NessusClientData_v2>
 """
-import xml.etree.ElementTree as ET
-from typing import List, Optional, Dict, Any
+from lxml import etree as ET
+from typing import BinaryIO, Iterator, List, Optional, Dict, Any, Union
 from dataclasses import dataclass, field
 from html import unescape
+from io import BytesIO
 import re
 import logging
+from collections import deque
+
+from app.services.parse_pool import PARSE_WORKERS, get_parse_pool
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class NessusFinding:
     """Represents a parsed Nessus finding in Atomik-compatible format"""
     plugin_id: str
@@ -53,6 +57,27 @@ class NessusFinding:
     exploitability_ease: Optional[str] = None
 
 
+# libxml2 options for untrusted scanner exports: entity expansion and network
+# access stay off (XXE), huge_tree lifts the text-node size cap that large
+# plugin_output blocks can hit
+XML_PARSE_OPTIONS = {
+    'huge_tree': True,
+    'resolve_entities': False,
+    'no_network': True,
+}
+
+# to_atomik_format limits: scanner output characters and reference links kept
+PLUGIN_OUTPUT_LIMIT = 3000
+MAX_REFERENCES = 10
+
+# HTML templates for the generated finding sections
+SCANNER_OUTPUT_HTML = """
+<h4>Scanner Output</h4>
+<pre><code>{}{}</code></pre>
+"""
+REFERENCE_ITEM_HTML = '<li><a href="{0}">{0}</a></li>'.format
+
+
 class NessusParser:
     """
     Parses Nessus XML exports into Atomik-compatible findings.
@@ -70,6 +95,16 @@ class NessusParser:
         4: 'Critical',
     }
     
+    # URLs inside the free-text see_also field
+    _URL_RE = re.compile(r'https?://[^\s<>"]+')
+    
+    # Single-valued ReportItem children read by _parse_report_item
+    _FIELDS = frozenset((
+        'description', 'solution', 'synopsis', 'plugin_output', 'risk_factor',
+        'see_also', 'cvss_base_score', 'cvss_vector', 'cvss3_base_score',
+        'cvss3_vector', 'exploit_available', 'exploitability_ease',
+    ))
+    
     @staticmethod
     def _clean_text(text: str) -> str:
         """Clean text content - unescape HTML and normalize whitespace."""
@@ -79,6 +114,10 @@ class NessusParser:
         # Unescape HTML entities
         text = unescape(text)
         
+        # Single-line fields (solution, synopsis, ...) need no split/join
+        if '\n' not in text:
+            return text.strip()
+        
         # Normalize whitespace but preserve paragraph breaks
         lines = text.split('\n')
         cleaned_lines = [line.strip() for line in lines]
@@ -87,14 +126,7 @@ class NessusParser:
         return text.strip()
     
     @staticmethod
-    def _get_text(element: Optional[ET.Element]) -> str:
-        """Safely get text from an XML element."""
-        if element is None:
-            return ""
-        return element.text or ""
-    
-    @staticmethod
-    def _get_attr(element: ET.Element, attr: str, default: str = "") -> str:
+    def _get_attr(element: ET._Element, attr: str, default: str = "") -> str:
         """Safely get attribute from an XML element."""
         return element.get(attr, default)
     
@@ -106,48 +138,46 @@ class NessusParser:
         except ValueError:
             return None
     
-    def _extract_references(self, item: ET.Element) -> List[str]:
-        """Extract all reference URLs from a ReportItem."""
+    def _extract_references(self, see_also: str, xrefs: List[str]) -> List[str]:
+        """Combine see_also URLs and xref entries into the reference list."""
         refs = []
         
         # See also field
-        see_also = self._get_text(item.find('see_also'))
         if see_also:
             # Split by newlines or spaces
-            urls = re.findall(r'https?://[^\s<>"]+', see_also)
-            refs.extend(urls)
+            refs.extend(self._URL_RE.findall(see_also))
         
         # Individual reference elements
-        for ref in item.findall('xref'):
-            refs.append(self._get_text(ref))
+        refs.extend(xrefs)
         
         return refs
     
-    def _extract_cves(self, item: ET.Element) -> List[str]:
-        """Extract CVE IDs from a ReportItem."""
-        cves = []
-        
-        for cve_el in item.findall('cve'):
-            cve = self._get_text(cve_el)
-            if cve:
-                cves.append(cve)
-        
-        return cves
+    @staticmethod
+    def _get_host_ip(properties: ET._Element, host_name: str) -> str:
+        """Read the host-ip tag from a HostProperties element."""
+        for prop in properties.iterchildren('tag'):
+            if prop.get('name') == 'host-ip':
+                return prop.text or host_name
+        return host_name
     
-    def _extract_cwes(self, item: ET.Element) -> List[str]:
-        """Extract CWE IDs from a ReportItem."""
-        cwes = []
-        
-        for cwe_el in item.findall('cwe'):
-            cwe = self._get_text(cwe_el)
-            if cwe:
-                cwes.append(f"CWE-{cwe}")
+    def _parse_host(self, host: ET._Element) -> List[NessusFinding]:
+        """Parse every ReportItem of a complete ReportHost element."""
+        host_name = host.get('name', 'Unknown')
+        properties = host.find('HostProperties')
+        host_ip = host_name if properties is None else self._get_host_ip(properties, host_name)
         
-        return cwes
+        findings = []
+        for item in host.iterchildren('ReportItem'):
+            try:
+                findings.append(self._parse_report_item(item, host_name, host_ip))
+            except Exception as e:
+                plugin_id = item.get('pluginID', 'unknown')
+                logger.warning(f"Failed to parse plugin {plugin_id}: {e}")
+        return findings
     
     def _parse_report_item(
         self, 
-        item: ET.Element, 
+        item: ET._Element, 
         host_name: str, 
         host_ip: str
     ) -> NessusFinding:
@@ -163,31 +193,47 @@ class NessusParser:
         # Map severity
         severity = self.SEVERITY_MAP.get(severity_num, 'Informational')
         
+        # Collect every child we need in one walk instead of a find()/
+        # findall() scan per field (first occurrence wins, as with find)
+        fields = {}
+        cves, cwes, xrefs = [], [], []
+        for child in item:
+            tag = child.tag
+            if tag == 'cve':
+                if child.text:
+                    cves.append(child.text)
+            elif tag == 'cwe':
+                if child.text:
+                    cwes.append(f"CWE-{child.text}")
+            elif tag == 'xref':
+                xrefs.append(child.text or "")
+            elif tag in self._FIELDS and tag not in fields:
+                fields[tag] = child.text or ""
+        get = fields.get
+        
         # Content fields
-        description = self._clean_text(self._get_text(item.find('description')))
-        solution = self._clean_text(self._get_text(item.find('solution')))
-        synopsis = self._clean_text(self._get_text(item.find('synopsis')))
-        plugin_output = self._clean_text(self._get_text(item.find('plugin_output')))
-        risk_factor = self._get_text(item.find('risk_factor'))
-        see_also = self._get_text(item.find('see_also'))
+        description = self._clean_text(get('description', ''))
+        solution = self._clean_text(get('solution', ''))
+        synopsis = self._clean_text(get('synopsis', ''))
+        plugin_output = self._clean_text(get('plugin_output', ''))
+        risk_factor = get('risk_factor', '')
+        see_also = get('see_also', '')
         
         # CVSS
-        cvss_score = self._parse_float(self._get_text(item.find('cvss_base_score')))
-        cvss_vector = self._get_text(item.find('cvss_vector'))
+        cvss_score = self._parse_float(get('cvss_base_score', ''))
+        cvss_vector = get('cvss_vector', '')
         
         # If no CVSS v2, try v3
         if cvss_score is None:
-            cvss_score = self._parse_float(self._get_text(item.find('cvss3_base_score')))
-            cvss_vector = self._get_text(item.find('cvss3_vector')) or cvss_vector
+            cvss_score = self._parse_float(get('cvss3_base_score', ''))
+            cvss_vector = get('cvss3_vector', '') or cvss_vector
         
         # Exploit info
-        exploit_available = self._get_text(item.find('exploit_available')) == 'true'
-        exploitability_ease = self._get_text(item.find('exploitability_ease'))
+        exploit_available = get('exploit_available') == 'true'
+        exploitability_ease = get('exploitability_ease', '')
         
         # References
-        cves = self._extract_cves(item)
-        cwes = self._extract_cwes(item)
-        refs = self._extract_references(item)
+        refs = self._extract_references(see_also, xrefs)
         
         return NessusFinding(
             plugin_id=plugin_id,
@@ -213,114 +259,180 @@ class NessusParser:
             exploitability_ease=exploitability_ease,
         )
     
-    def parse_xml(self, xml_content: str) -> List[NessusFinding]:
+    def parse_stream(
+        self,
+        file_or_path: Union[str, BinaryIO],
+        encoding: Optional[str] = None
+    ) -> Iterator[NessusFinding]:
         """
-        Parse Nessus XML export content.
+        Incrementally parse a Nessus XML export, yielding findings as they
+        are read.
+        
+        Each ReportItem is cleared (and detached) once parsed, so peak memory
+        stays around one item rather than the whole document tree.
         
         Args:
-            xml_content: Raw XML string from Nessus export
+            file_or_path: Path or binary file object of the Nessus export
+            encoding: Override for the document's declared encoding
             
-        Returns:
-            List of NessusFinding objects
+        Yields:
+            NessusFinding objects in document order
         """
+        host_name = host_ip = 'Unknown'
+        count = 0
+        
+        events = ET.iterparse(
+            file_or_path,
+            events=('start', 'end'),
+            tag=('ReportHost', 'HostProperties', 'ReportItem'),
+            encoding=encoding,
+            **XML_PARSE_OPTIONS,
+        )
         try:
-            root = ET.fromstring(xml_content)
-        except ET.ParseError as e:
-            logger.error(f"Failed to parse Nessus XML: {e}")
-            raise ValueError(f"Invalid XML format: {e}")
-        
-        findings = []
-        
-        # Find all Report elements
-        for report in root.findall('.//Report'):
-            # Find all ReportHost elements
-            for host in report.findall('ReportHost'):
-                host_name = host.get('name', 'Unknown')
+            for event, elem in events:
+                tag = elem.tag
+                if event == 'start':
+                    if tag == 'ReportHost':
+                        host_name = elem.get('name', 'Unknown')
+                        host_ip = host_name
+                    continue
                 
-                # Get host properties for IP
-                host_ip = host_name
-                properties = host.find('HostProperties')
-                if properties is not None:
-                    for tag in properties.findall('tag'):
-                        if tag.get('name') == 'host-ip':
-                            host_ip = tag.text or host_name
-                            break
+                if tag == 'HostProperties':
+                    host_ip = self._get_host_ip(elem, host_name)
+                    continue
                 
-                # Parse all ReportItems for this host
-                for item in host.findall('ReportItem'):
+                if tag == 'ReportItem':
                     try:
-                        finding = self._parse_report_item(item, host_name, host_ip)
-                        findings.append(finding)
+                        finding = self._parse_report_item(elem, host_name, host_ip)
                     except Exception as e:
-                        plugin_id = item.get('pluginID', 'unknown')
+                        plugin_id = elem.get('pluginID', 'unknown')
                         logger.warning(f"Failed to parse plugin {plugin_id}: {e}")
-                        continue
+                    else:
+                        count += 1
+                        yield finding
+                
+                # Release parsed items (and finished hosts) as we go
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del elem.getparent()[0]
+        except ET.XMLSyntaxError as e:
+            logger.error(f"Failed to parse Nessus XML: {e}")
+            raise ValueError(f"Invalid XML format: {e}")
         
-        logger.info(f"Parsed {len(findings)} findings from Nessus XML")
-        return findings
+        logger.info(f"Parsed {count} findings from Nessus XML")
     
-    def to_atomik_format(self, finding: NessusFinding) -> Dict[str, Any]:
-        """
-        Convert a NessusFinding to Atomik finding format.
-        
-        Returns:
-            Dictionary ready for Atomik API
+    def parse_parallel(
+        self,
+        file_or_path: Union[str, BinaryIO],
+        encoding: Optional[str] = None
+    ) -> Iterator[NessusFinding]:
         """
-        # Build description with synopsis
-        description_parts = []
-        
-        if finding.synopsis:
-            description_parts.append(f"<p><strong>Synopsis:</strong> {finding.synopsis}</p>")
-        
-        if finding.description:
-            description_parts.append(f"<div>{finding.description}</div>")
+        Parse a Nessus XML export across a process pool.
         
-        description = "\n".join(description_parts) if description_parts else finding.plugin_name
-        
-        # Build evidence from plugin output
-        evidence_parts = []
-        
-        # Add target info
-        target = f"{finding.host}:{finding.port}/{finding.protocol}"
-        evidence_parts.append(f"<p><strong>Target:</strong> {target}</p>")
-        
-        if finding.host_ip != finding.host:
-            evidence_parts.append(f"<p><strong>IP:</strong> {finding.host_ip}</p>")
-        
-        # Add plugin output as evidence
-        if finding.plugin_output:
-            output_escaped = self._escape_html(finding.plugin_output[:3000])
-            if len(finding.plugin_output) > 3000:
-                output_escaped += "\n... (truncated)"
-            evidence_parts.append(f"""
-<h4>Scanner Output</h4>
-<pre><code>{output_escaped}</code></pre>
-""")
+        The parent streams the document and ships each serialized ReportHost
+        to a worker, which re-parses it and runs _parse_report_item on its
+        items. Results are yielded in document order, with at most two hosts
+        per worker in flight so memory stays bounded. Falls back to
+        parse_stream on single-core machines.
         
-        # Add exploit info if available
-        if finding.exploit_available:
-            evidence_parts.append(f"<p><strong>⚠️ Exploit Available:</strong> {finding.exploitability_ease or 'Yes'}</p>")
-        
-        evidence = "\n".join(evidence_parts) if evidence_parts else None
+        Args:
+            file_or_path: Path or binary file object of the Nessus export
+            encoding: Override for the document's declared encoding
+            
+        Yields:
+            NessusFinding objects in document order
+        """
+        if PARSE_WORKERS < 2:
+            yield from self.parse_stream(file_or_path, encoding)
+            return
+        
+        pool = get_parse_pool()
+        pending = deque()
+        count = 0
+        
+        events = ET.iterparse(
+            file_or_path,
+            events=('end',),
+            tag='ReportHost',
+            encoding=encoding,
+            **XML_PARSE_OPTIONS,
+        )
+        try:
+            for _, host in events:
+                pending.append(pool.submit(_parse_host_bytes, ET.tostring(host)))
+                host.clear()
+                while host.getprevious() is not None:
+                    del host.getparent()[0]
+                
+                while len(pending) > 2 * PARSE_WORKERS:
+                    findings = pending.popleft().result()
+                    count += len(findings)
+                    yield from findings
+        except ET.XMLSyntaxError as e:
+            for future in pending:
+                future.cancel()
+            logger.error(f"Failed to parse Nessus XML: {e}")
+            raise ValueError(f"Invalid XML format: {e}")
         
-        # Build references
-        refs_parts = []
+        while pending:
+            findings = pending.popleft().result()
+            count += len(findings)
+            yield from findings
         
-        if finding.cve_ids:
-            cve_links = ", ".join(finding.cve_ids)
-            refs_parts.append(f"<p><strong>CVE:</strong> {cve_links}</p>")
+        logger.info(f"Parsed {count} findings from Nessus XML ({PARSE_WORKERS} workers)")
+    
+    def parse_xml(self, xml_content: Union[str, bytes]) -> List[NessusFinding]:
+        """
+        Parse Nessus XML export content.
         
-        if finding.cwe_ids:
-            cwe_links = ", ".join(finding.cwe_ids)
-            refs_parts.append(f"<p><strong>CWE:</strong> {cwe_links}</p>")
+        Args:
+            xml_content: Raw XML string (or bytes) from Nessus export
+            
+        Returns:
+            List of NessusFinding objects
+        """
+        if isinstance(xml_content, str):
+            # Already decoded; re-encode and ignore the declared encoding
+            return list(self.parse_stream(BytesIO(xml_content.encode('utf-8')), encoding='utf-8'))
+        return list(self.parse_stream(BytesIO(xml_content)))
+    
+    def to_atomik_format(self, finding: NessusFinding) -> Dict[str, Any]:
+        """
+        Convert a NessusFinding to Atomik finding format.
         
+        Returns:
+            Dictionary ready for Atomik API
+        """
+        # Each section is one join over the parts that apply; empty
+        # fields contribute nothing and are never formatted
+        description = "\n".join([part for part in (
+            f"<p><strong>Synopsis:</strong> {finding.synopsis}</p>" if finding.synopsis else "",
+            f"<div>{finding.description}</div>" if finding.description else "",
+        ) if part]) or finding.plugin_name
+        
+        # Evidence: target, IP, truncated plugin output, exploit info
+        output = finding.plugin_output
+        evidence = "\n".join([part for part in (
+            f"<p><strong>Target:</strong> {finding.host}:{finding.port}/{finding.protocol}</p>",
+            f"<p><strong>IP:</strong> {finding.host_ip}</p>" if finding.host_ip != finding.host else "",
+            SCANNER_OUTPUT_HTML.format(
+                self._escape_html(output[:PLUGIN_OUTPUT_LIMIT]),
+                "\n... (truncated)" if len(output) > PLUGIN_OUTPUT_LIMIT else "",
+            ) if output else "",
+            f"<p><strong>⚠️ Exploit Available:</strong> {finding.exploitability_ease or 'Yes'}</p>"
+            if finding.exploit_available else "",
+        ) if part])
+        
+        # References: CVE and CWE lines, then up to MAX_REFERENCES links
+        refs_parts = [part for part in (
+            f"<p><strong>CVE:</strong> {', '.join(finding.cve_ids)}</p>" if finding.cve_ids else "",
+            f"<p><strong>CWE:</strong> {', '.join(finding.cwe_ids)}</p>" if finding.cwe_ids else "",
+        ) if part]
         if finding.references:
             refs_parts.append("<p><strong>References:</strong></p><ul>")
-            for ref in finding.references[:10]:  # Limit to 10 refs
-                refs_parts.append(f"<li><a href=\"{ref}\">{ref}</a></li>")
+            refs_parts.extend(map(REFERENCE_ITEM_HTML, finding.references[:MAX_REFERENCES]))
             refs_parts.append("</ul>")
-        
-        references = "\n".join(refs_parts) if refs_parts else None
+        references = "\n".join(refs_parts) or None
         
         # Build affected systems
         affected_systems = f"{finding.host}:{finding.port}"
@@ -344,6 +456,8 @@ class NessusParser:
     @staticmethod
     def _escape_html(text: str) -> str:
         """Escape HTML special characters for safe display in <pre> tags."""
+        # Chained replace beats str.translate here: each call is a C-level
+        # scan that returns the string itself when there is nothing to replace
         return (text
             .replace('&', '&amp;')
             .replace('<', '&lt;')
@@ -354,3 +468,14 @@ class NessusParser:
 
 # Singleton instance
 nessus_parser = NessusParser()
+
+
+def _parse_host_bytes(xml_bytes: bytes) -> List[NessusFinding]:
+    """Process-pool task: parse one serialized ReportHost."""
+    # The fragment was serialized from a well-formed document, but without its
+    # DTD: references to entities declared there would be "undefined" here.
+    # recover keeps them as unexpanded entity nodes, as in the streaming parse.
+    host = ET.fromstring(
+        xml_bytes, parser=ET.XMLParser(recover=True, **XML_PARSE_OPTIONS)
+    )
+    return nessus_parser._parse_host(host)
@@ -0,0 +1,36 @@
+"""
+Scanner Import Parse Pool
+
+Process pool shared by the scanner parsers (Nessus, Qualys) for large
+exports. Parsing a host's findings is CPU-bound Python, so big documents
+are streamed in the request worker and their hosts fanned out here.
+"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+
+# Exports at least this large are parsed across the pool, one host per
+# task; smaller ones aren't worth the IPC overhead
+PARALLEL_PARSE_THRESHOLD = 16 * 1024 * 1024
+PARSE_WORKERS = os.cpu_count() or 1
+
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """Create the shared host-parsing pool on first use."""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # spawn: forking a process that runs an event loop and worker
+            # threads can deadlock the child on locks held at fork time
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _parse_pool
@@ -4,12 +4,20 @@ PDF Service - Premium PDF Generator Service
 Renders pixel-perfect, magazine-quality PDFs using Playwright and Jinja2.
 Part of the Atomik Report Engine.
 """
+import os
+import re
+import time
+import base64
+import asyncio
 import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional, Dict, Any, Literal
+from typing import AsyncIterator, Awaitable, Callable, Optional, Dict, Any, Literal, Tuple
 
-from jinja2 import Environment, FileSystemLoader
-from playwright.async_api import async_playwright, Browser, Page
+import httpx
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Route
 
 logger = logging.getLogger(__name__)
 
@@ -21,18 +29,223 @@ TEMPLATE_OPTIONS = {
     "classic": {
         "file": "report_classic.html",
         "name": "Classic Premium",
-        "description": "Dark header, structured cards, professional look"
+        "description": "Dark header, structured cards, professional look",
+        "fonts": "https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800;900&family=JetBrains+Mono:wght@400;500;600;700&display=swap",
     },
     "apple": {
         "file": "report_apple.html", 
         "name": "The Apple Minimal",
-        "description": "Clean, spacious, Apple-inspired design"
+        "description": "Clean, spacious, Apple-inspired design",
+        "fonts": "https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap",
     }
 }
 
 # Default template
 DEFAULT_TEMPLATE = "classic"
 
+# Chromium launch flags for containerized, headless rendering. Beyond the
+# sandbox/shm/GPU basics, these switch off background services an
+# offscreen print renderer never uses, and disable font hinting so glyph
+# metrics (and therefore line breaks) don't depend on the host's fonts setup.
+# Site isolation is deliberately left on: renders include remote images.
+CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-translate',
+    '--no-first-run',
+    '--mute-audio',
+    '--hide-scrollbars',
+    '--font-render-hinting=none',
+]
+
+# Page contexts lay out at A4 size in CSS pixels (96 dpi), so the screen
+# layout already matches the printed page
+PDF_VIEWPORT = {"width": 794, "height": 1123}
+
+# Resolves once web fonts are loaded and every <img> is decoded. The templates
+# run no scripts, so this is all a page needs before printing - no
+# networkidle wait or fixed sleep.
+PAINT_READY_JS = """async () => {
+    await document.fonts.ready;
+    await Promise.all(
+        [...document.images]
+            .filter(img => !img.complete)
+            .map(img => img.decode().catch(() => {}))
+    );
+}"""
+
+# Web-font stylesheets are fetched once and inlined into every render with
+# the font files as data: URIs, so pages make no network requests for them.
+# Google Fonts picks the font format from the User-Agent; a Chrome UA gets
+# woff2. After a failed fetch, renders link the stylesheet as before and the
+# fetch is retried once FONT_RETRY_INTERVAL seconds have passed.
+FONT_FETCH_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ),
+}
+FONT_FETCH_TIMEOUT = 10.0
+FONT_RETRY_INTERVAL = 300.0
+_FONT_URL_RE = re.compile(r"url\((https://[^)]+)\)")
+
+# Browser contexts kept warm for rendering; also the cap on concurrent renders
+PDF_CONTEXT_POOL_SIZE = int(os.getenv("PDF_CONTEXT_POOL_SIZE", "4"))
+
+# PDFs rendered in a context before it is closed and replaced, so Chromium
+# memory growth within a long-lived context stays bounded
+PDF_CONTEXT_MAX_USES = 50
+
+
+# Images and fonts fetched by renders (evidence screenshots, rich-text images,
+# linked fonts) are kept in memory across contexts, up to this many bytes.
+# Uploads are stored under unique names, so a URL's content never changes.
+PDF_ASSET_CACHE_BYTES = 64 * 1024 * 1024
+PDF_ASSET_MAX_BYTES = 8 * 1024 * 1024
+CACHED_RESOURCE_TYPES = frozenset({"image", "font"})
+
+
+class _AssetCache:
+    """
+    LRU cache of fetched page assets, served through a Playwright route.
+    
+    Installed on every pooled context, so an asset fetched by one render is
+    fulfilled from memory by later renders in any context.
+    """
+    
+    def __init__(
+        self,
+        max_bytes: int = PDF_ASSET_CACHE_BYTES,
+        max_item_bytes: int = PDF_ASSET_MAX_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self._entries: OrderedDict[str, Tuple[bytes, str]] = OrderedDict()
+        self._size = 0
+    
+    def _put(self, url: str, body: bytes, content_type: str) -> None:
+        if len(body) > self.max_item_bytes or url in self._entries:
+            return
+        self._entries[url] = (body, content_type)
+        self._size += len(body)
+        while self._size > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+    
+    async def handle(self, route: Route) -> None:
+        """Route handler: serve cached assets, fetch and remember the rest."""
+        request = route.request
+        if request.method != "GET" or request.resource_type not in CACHED_RESOURCE_TYPES:
+            await route.continue_()
+            return
+        
+        entry = self._entries.get(request.url)
+        if entry is not None:
+            self._entries.move_to_end(request.url)
+            body, content_type = entry
+            await route.fulfill(status=200, body=body, content_type=content_type)
+            return
+        
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception as e:
+            logger.warning(f"Failed to fetch {request.url} for PDF render: {e}")
+            await route.abort()
+            return
+        if response.ok:
+            self._put(request.url, body, response.headers.get("content-type", ""))
+        await route.fulfill(response=response, body=body)
+
+
+class _ContextPool:
+    """
+    Fixed-size pool of reusable browser contexts, each with a warm page.
+    
+    Each slot holds a (context, page, uses_remaining) triple; slots start
+    empty and are filled on first use. Renders reuse the slot's page, since
+    set_content replaces its whole document, so no page (renderer target) is
+    created or torn down per PDF. A context is replaced once its uses run
+    out, after a failed render, or when the browser behind it has gone away.
+    """
+    
+    def __init__(
+        self,
+        get_browser: Callable[[], Awaitable[Browser]],
+        size: int = PDF_CONTEXT_POOL_SIZE,
+        max_uses: int = PDF_CONTEXT_MAX_USES,
+        assets: Optional[_AssetCache] = None,
+    ):
+        self._get_browser = get_browser
+        self.max_uses = max_uses
+        self._assets = assets
+        self._slots: asyncio.Queue = asyncio.Queue()
+        for _ in range(size):
+            self._slots.put_nowait((None, None, 0))
+    
+    @staticmethod
+    async def _discard(context: Optional[BrowserContext]) -> None:
+        if context is None:
+            return
+        try:
+            await context.close()
+        except Exception as e:
+            logger.debug(f"Ignoring error closing browser context: {e}")
+    
+    async def _acquire(self) -> Tuple[BrowserContext, Page, int]:
+        context, page, uses = await self._slots.get()
+        try:
+            if (
+                context is None
+                or uses <= 0
+                or page.is_closed()
+                or context.browser is None
+                or not context.browser.is_connected()
+            ):
+                await self._discard(context)
+                browser = await self._get_browser()
+                context = await browser.new_context(
+                    viewport=PDF_VIEWPORT,
+                    device_scale_factor=1,
+                )
+                uses = self.max_uses
+                try:
+                    if self._assets is not None:
+                        await context.route("**/*", self._assets.handle)
+                    page = await context.new_page()
+                except BaseException:
+                    await self._discard(context)
+                    raise
+        except BaseException:
+            # Keep the pool at full size even if the browser failed to start
+            self._slots.put_nowait((None, None, 0))
+            raise
+        return context, page, uses
+    
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """Lease a warm page for one render, waiting if all are in use."""
+        context, page, uses = await self._acquire()
+        uses -= 1
+        try:
+            yield page
+        except BaseException:
+            # Don't hand a page in an unknown state to the next render
+            uses = 0
+            raise
+        finally:
+            if uses <= 0:
+                await self._discard(context)
+                self._slots.put_nowait((None, None, 0))
+            else:
+                self._slots.put_nowait((context, page, uses))
+
 
 class PDFService:
     """
@@ -46,7 +259,19 @@ class PDFService:
         """Initialize the PDF service with Jinja2 environment."""
         self._browser: Optional[Browser] = None
         self._playwright = None
+        self._browser_lock = asyncio.Lock()
+        self._contexts = _ContextPool(self._get_browser, assets=_AssetCache())
+        # Stylesheet URL -> CSS with fonts inlined, and when fetches last failed
+        self._font_css: Dict[str, str] = {}
+        self._font_css_failed: Dict[str, float] = {}
+        self._font_css_lock = asyncio.Lock()
         self._jinja_env = self._create_jinja_env()
+        # Compiled once up front; generate() indexes this instead of going
+        # through the loader on every PDF
+        self._templates: Dict[str, Template] = {
+            template_id: self._jinja_env.get_template(meta["file"])
+            for template_id, meta in TEMPLATE_OPTIONS.items()
+        }
     
     def _create_jinja_env(self) -> Environment:
         """
@@ -62,10 +287,83 @@ class PDFService:
             autoescape=False,  # We use |safe filter for HTML content
             trim_blocks=True,
             lstrip_blocks=True,
+            # Templates ship with the code: never stat for changes or evict
+            auto_reload=False,
+            cache_size=-1,
+            # Persist compiled bytecode so restarted workers skip parsing.
+            # No directory given: Jinja uses a private per-user temp dir
+            # (0700, ownership checked) rather than a shared, writable path.
+            bytecode_cache=FileSystemBytecodeCache(),
         )
         
         return env
     
+    async def _get_browser(self) -> Browser:
+        """
+        Return the shared Chromium instance, launching it on first use (or
+        again if it crashed or was disconnected).
+        """
+        async with self._browser_lock:
+            if self._browser is None or not self._browser.is_connected():
+                if not self._playwright:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(
+                    headless=True,
+                    args=CHROMIUM_ARGS,
+                )
+            return self._browser
+    
+    async def _get_font_css(self, url: str) -> Optional[str]:
+        """
+        Return the web-font stylesheet at `url` with each font file inlined
+        as a data: URI, fetching it on first use.
+        
+        Returns None while the stylesheet can't be fetched; the templates
+        then link it directly instead.
+        """
+        css = self._font_css.get(url)
+        if css is not None:
+            return css
+        
+        async with self._font_css_lock:
+            css = self._font_css.get(url)
+            if css is not None:
+                return css
+            failed_at = self._font_css_failed.get(url)
+            if failed_at is not None and time.monotonic() - failed_at < FONT_RETRY_INTERVAL:
+                return None
+            
+            try:
+                async with httpx.AsyncClient(
+                    timeout=FONT_FETCH_TIMEOUT,
+                    headers=FONT_FETCH_HEADERS,
+                ) as client:
+                    response = await client.get(url)
+                    response.raise_for_status()
+                    css = response.text
+                    
+                    font_urls = list(dict.fromkeys(_FONT_URL_RE.findall(css)))
+                    font_responses = await asyncio.gather(
+                        *(client.get(font_url) for font_url in font_urls)
+                    )
+                
+                data_uris = {}
+                for font_url, font_response in zip(font_urls, font_responses):
+                    font_response.raise_for_status()
+                    content_type = font_response.headers.get("content-type", "font/woff2")
+                    encoded = base64.b64encode(font_response.content).decode("ascii")
+                    data_uris[font_url] = f"data:{content_type};base64,{encoded}"
+                css = _FONT_URL_RE.sub(lambda m: f"url({data_uris[m.group(1)]})", css)
+            except httpx.HTTPError as e:
+                logger.warning(f"Failed to inline web fonts from {url}: {e}")
+                self._font_css_failed[url] = time.monotonic()
+                return None
+            
+            self._font_css[url] = css
+            self._font_css_failed.pop(url, None)
+            logger.info(f"Inlined {len(font_urls)} web font files ({len(css)} characters)")
+            return css
+    
     async def generate(self, context: Dict[str, Any], template_id: str = None) -> bytes:
         """
         Generate PDF from context dictionary.
@@ -90,41 +388,28 @@ class PDFService:
         logger.info(f"Generating PDF with template: {template_id} ({template_file})")
         
         try:
-            # Step 1: Setup Jinja2 Environment (already done in __init__)
-            # Step 2: Render the template
-            template = self._jinja_env.get_template(template_file)
-            html_content = template.render(context)
+            # Step 1: Setup Jinja2 Environment and templates (done in __init__)
+            # Step 2: Render the template, with web fonts inlined when available
+            fonts_url = TEMPLATE_OPTIONS[template_id]["fonts"]
+            font_css = await self._get_font_css(fonts_url)
+            template = self._templates[template_id]
+            html_content = template.render(context, fonts_url=fonts_url, font_css=font_css)
             
             logger.debug(f"Rendered HTML template: {len(html_content)} characters")
             
-            # Step 3: Launch Playwright
-            if not self._playwright:
-                self._playwright = await async_playwright().start()
-            
-            browser = await self._playwright.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                ]
-            )
-            
-            try:
-                # Step 4: New Page
-                page: Page = await browser.new_page()
-                
-                # Step 5: Set Content
+            # Step 3: Lease a warm page from the pool; this also bounds how
+            # many PDFs render at once
+            async with self._contexts.page() as page:
+                # Step 4: Set Content (replaces the previous render's document)
                 await page.set_content(
                     html_content,
-                    wait_until="networkidle"
+                    wait_until="load"
                 )
                 
-                # Allow time for fonts and images to load
-                await page.wait_for_timeout(500)
+                # Wait for web fonts and images to be paint-ready
+                await page.evaluate(PAINT_READY_JS)
                 
-                # Step 6: Print to PDF
+                # Step 5: Print to PDF
                 pdf_bytes = await page.pdf(
                     format="A4",
                     print_background=True,
@@ -135,20 +420,20 @@ class PDFService:
                         "right": "0"
                     }  # We handle margins in CSS
                 )
-                
-                logger.info(f"Generated PDF: {len(pdf_bytes)} bytes")
-                
-                return pdf_bytes
-                
-            finally:
-                await browser.close()
-                
+            
+            logger.info(f"Generated PDF: {len(pdf_bytes)} bytes")
+            
+            return pdf_bytes
+            
         except Exception as e:
             logger.error(f"Failed to generate PDF: {e}", exc_info=True)
             raise RuntimeError(f"PDF generation failed: {str(e)}")
     
     async def close(self):
-        """Close Playwright instance."""
+        """Close the shared browser and the Playwright instance."""
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
         if self._playwright:
             await self._playwright.stop()
             self._playwright = None
@@ -16,17 +16,49 @@ Qualys XML Structure:
   </HOST>
 </SCAN>
 """
-import xml.etree.ElementTree as ET
-from typing import List, Optional, Dict, Any
+from lxml import etree as ET
+from typing import BinaryIO, Iterator, List, Optional, Dict, Any, Tuple, Union
 from dataclasses import dataclass, field
 from html import unescape
+from io import BytesIO
 import re
 import logging
+from collections import deque
+from functools import lru_cache
+
+from app.services.parse_pool import PARSE_WORKERS, get_parse_pool
 
 logger = logging.getLogger(__name__)
 
+# libxml2 options for untrusted scanner exports: entity expansion and network
+# access stay off (XXE), huge_tree lifts the size caps large scans can hit,
+# and whitespace-only text between elements is not kept in the tree
+XML_PARSE_OPTIONS = {
+    'huge_tree': True,
+    'remove_blank_text': True,
+    'resolve_entities': False,
+    'no_network': True,
+}
+
+# to_atomik_format limits: scan result characters and vendor references kept
+RESULT_OUTPUT_LIMIT = 3000
+MAX_VENDOR_REFS = 10
+
+# HTML templates for the generated finding sections
+SCAN_RESULT_HTML = """
+<h4>Scan Result</h4>
+<pre><code>{}{}</code></pre>
+"""
+TRUNCATED_MARKER = "\n... (truncated)"
+PCI_FLAG_HTML = "<p><strong>⚠️ PCI Compliance Issue</strong></p>"
+VENDOR_REFS_HEADER_HTML = "<p><strong>Vendor References:</strong></p><ul>"
+VENDOR_LINK_HTML = '<li><a href="{0}">{0}</a></li>'.format
+
+# Distinct QIDs whose description/references HTML is kept between findings
+STATIC_HTML_CACHE_SIZE = 4096
+
 
-@dataclass
+@dataclass(slots=True)
 class QualysFinding:
     """Represents a parsed Qualys finding in Atomik-compatible format"""
     qid: str  # Qualys ID
@@ -69,22 +101,27 @@ class QualysParser:
         5: 'Critical',
     }
     
-    @staticmethod
-    def _clean_text(text: str) -> str:
+    # Literal CDATA markers left in (double-encoded) field text
+    _CDATA_RE = re.compile(r'<!\[CDATA\[|\]\]>')
+    
+    @classmethod
+    def _clean_text(cls, text: str) -> str:
         """Clean text content - unescape HTML and normalize whitespace."""
         if not text:
             return ""
         
         # Unescape HTML entities
-        text = unescape(text)
+        if '&' in text:
+            text = unescape(text)
         
         # Remove CDATA markers if present
-        text = re.sub(r'<!\[CDATA\[|\]\]>', '', text)
+        if '<![CDATA[' in text or ']]>' in text:
+            text = cls._CDATA_RE.sub('', text)
         
         return text.strip()
     
     @staticmethod
-    def _get_text(element: Optional[ET.Element]) -> str:
+    def _get_text(element: Optional[ET._Element]) -> str:
         """Safely get text from an XML element."""
         if element is None:
             return ""
@@ -106,33 +143,35 @@ class QualysParser:
         except ValueError:
             return None
     
-    def _extract_cves(self, vuln: ET.Element) -> List[str]:
-        """Extract CVE IDs from a VULN element."""
+    def _extract_cves(
+        self,
+        cve_list: Optional[ET._Element],
+        direct_cves: List[ET._Element]
+    ) -> List[str]:
+        """Extract CVE IDs from a VULN's CVE_ID_LIST and direct CVE_ID children."""
         cves = []
         
         # Try CVE_ID_LIST structure
-        cve_list = vuln.find('CVE_ID_LIST')
         if cve_list is not None:
-            for cve_el in cve_list.findall('.//CVE_ID'):
+            for cve_el in cve_list.iter('CVE_ID'):
                 cve = self._get_text(cve_el.find('ID'))
                 if cve:
                     cves.append(cve)
         
         # Also try direct CVE elements
-        for cve_el in vuln.findall('CVE_ID'):
+        for cve_el in direct_cves:
             cve = self._get_text(cve_el)
             if cve and cve not in cves:
                 cves.append(cve)
         
         return cves
     
-    def _extract_vendor_refs(self, vuln: ET.Element) -> List[str]:
-        """Extract vendor references from a VULN element."""
+    def _extract_vendor_refs(self, vendor_list: Optional[ET._Element]) -> List[str]:
+        """Extract vendor references from a VULN's VENDOR_REFERENCE_LIST."""
         refs = []
         
-        vendor_list = vuln.find('VENDOR_REFERENCE_LIST')
         if vendor_list is not None:
-            for ref in vendor_list.findall('.//VENDOR_REFERENCE'):
+            for ref in vendor_list.iter('VENDOR_REFERENCE'):
                 ref_id = self._get_text(ref.find('ID'))
                 ref_url = self._get_text(ref.find('URL'))
                 if ref_url:
@@ -142,13 +181,12 @@ class QualysParser:
         
         return refs
     
-    def _extract_bugtraqs(self, vuln: ET.Element) -> List[str]:
-        """Extract Bugtraq IDs from a VULN element."""
+    def _extract_bugtraqs(self, bugtraq_list: Optional[ET._Element]) -> List[str]:
+        """Extract Bugtraq IDs from a VULN's BUGTRAQ_ID_LIST."""
         bugtraqs = []
         
-        bugtraq_list = vuln.find('BUGTRAQ_ID_LIST')
         if bugtraq_list is not None:
-            for bt in bugtraq_list.findall('.//BUGTRAQ_ID'):
+            for bt in bugtraq_list.iter('BUGTRAQ_ID'):
                 bt_id = self._get_text(bt.find('ID'))
                 if bt_id:
                     bugtraqs.append(f"BID-{bt_id}")
@@ -157,50 +195,64 @@ class QualysParser:
     
     def _parse_vuln(
         self, 
-        vuln: ET.Element, 
+        vuln: ET._Element, 
         host_ip: str,
         host_dns: Optional[str]
     ) -> QualysFinding:
         """Parse a single VULN element into a QualysFinding."""
         
+        # Index the children in one walk instead of a find() scan per field
+        # (first occurrence wins, as with find)
+        children = {}
+        direct_cves = []
+        for child in vuln:
+            tag = child.tag
+            if tag == 'CVE_ID':
+                direct_cves.append(child)
+            if tag not in children:
+                children[tag] = child
+        
+        def text(tag: str) -> str:
+            return self._get_text(children.get(tag))
+        
         # Basic fields
-        qid = self._get_text(vuln.find('QID'))
-        title = self._clean_text(self._get_text(vuln.find('TITLE')))
-        severity_num = self._parse_int(self._get_text(vuln.find('SEVERITY')), 1)
+        qid = text('QID')
+        title = self._clean_text(text('TITLE'))
+        severity_num = self._parse_int(text('SEVERITY'), 1)
         
         # Map severity
         severity = self.SEVERITY_MAP.get(severity_num, 'Informational')
         
         # Port info (might be nested or direct)
-        port = self._get_text(vuln.find('PORT'))
-        protocol = self._get_text(vuln.find('PROTOCOL'))
+        port = text('PORT')
+        protocol = text('PROTOCOL')
         
         # Content fields
-        category = self._clean_text(self._get_text(vuln.find('CATEGORY')))
-        consequence = self._clean_text(self._get_text(vuln.find('CONSEQUENCE')))
-        solution = self._clean_text(self._get_text(vuln.find('SOLUTION')))
-        diagnosis = self._clean_text(self._get_text(vuln.find('DIAGNOSIS')))
-        result = self._clean_text(self._get_text(vuln.find('RESULT')))
+        category = self._clean_text(text('CATEGORY'))
+        consequence = self._clean_text(text('CONSEQUENCE'))
+        solution = self._clean_text(text('SOLUTION'))
+        diagnosis = self._clean_text(text('DIAGNOSIS'))
+        result = self._clean_text(text('RESULT'))
         
         # CVSS
-        cvss_score = self._parse_float(self._get_text(vuln.find('CVSS_BASE')))
-        cvss_vector = self._get_text(vuln.find('CVSS_TEMPORAL'))
+        cvss_score = self._parse_float(text('CVSS_BASE'))
+        cvss_vector = text('CVSS_TEMPORAL')
         
         # Try CVSS3 if v2 not present
         if cvss_score is None:
-            cvss_score = self._parse_float(self._get_text(vuln.find('CVSS3_BASE')))
-            cvss_vector = self._get_text(vuln.find('CVSS3_TEMPORAL')) or cvss_vector
+            cvss_score = self._parse_float(text('CVSS3_BASE'))
+            cvss_vector = text('CVSS3_TEMPORAL') or cvss_vector
         
         # PCI compliance flag
-        pci_flag = self._get_text(vuln.find('PCI_FLAG')) == '1'
+        pci_flag = text('PCI_FLAG') == '1'
         
         # Exploitability
-        exploitability = self._get_text(vuln.find('EXPLOITABILITY'))
+        exploitability = text('EXPLOITABILITY')
         
         # References
-        cves = self._extract_cves(vuln)
-        vendor_refs = self._extract_vendor_refs(vuln)
-        bugtraqs = self._extract_bugtraqs(vuln)
+        cves = self._extract_cves(children.get('CVE_ID_LIST'), direct_cves)
+        vendor_refs = self._extract_vendor_refs(children.get('VENDOR_REFERENCE_LIST'))
+        bugtraqs = self._extract_bugtraqs(children.get('BUGTRAQ_ID_LIST'))
         
         return QualysFinding(
             qid=qid,
@@ -225,148 +277,216 @@ class QualysParser:
             exploitability=exploitability,
         )
     
-    def parse_xml(self, xml_content: str) -> List[QualysFinding]:
+    def _iterparse(
+        self,
+        source: Union[str, BinaryIO],
+        tag: str,
+        encoding: Optional[str]
+    ) -> Iterator[ET._Element]:
         """
-        Parse Qualys XML export content.
+        Yield each completed `tag` element of the document, then clear and
+        detach it so only the element being processed is held in memory.
+        """
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        for _, elem in ET.iterparse(
+            source, events=('end',), tag=tag, encoding=encoding, **XML_PARSE_OPTIONS
+        ):
+            yield elem
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    
+    def _parse_vulns(self, vulns, host_ip: str, host_dns: Optional[str]) -> Iterator[QualysFinding]:
+        """Parse VULN elements for one host, logging and skipping bad ones."""
+        for vuln in vulns:
+            try:
+                yield self._parse_vuln(vuln, host_ip, host_dns)
+            except Exception as e:
+                qid = self._get_text(vuln.find('QID'))
+                logger.warning(f"Failed to parse QID {qid}: {e}")
+    
+    def _parse_host(self, host: ET._Element) -> List[QualysFinding]:
+        """Parse every VULN under a SCAN/HOST element."""
+        host_ip = self._get_text(host.find('IP'))
+        host_dns = self._get_text(host.find('DNS')) or self._get_text(host.find('NETBIOS'))
+        return list(self._parse_vulns(host.iter('VULN'), host_ip, host_dns))
+    
+    def parse_stream(
+        self,
+        file_or_path: Union[str, BinaryIO],
+        encoding: Optional[str] = None
+    ) -> Iterator[QualysFinding]:
+        """
+        Incrementally parse a Qualys XML export, yielding findings host by
+        host.
+        
+        Each HOST (or bare VULN) is cleared once parsed, so peak memory stays
+        around one host rather than the whole document. The structures are
+        tried in turn, each in its own streaming pass, until one produces
+        findings; a file object must therefore be seekable.
         
         Args:
-            xml_content: Raw XML string from Qualys export
+            file_or_path: Path or seekable binary file object of the export
+            encoding: Override for the document's declared encoding
             
-        Returns:
-            List of QualysFinding objects
+        Yields:
+            QualysFinding objects in document order
         """
+        count = 0
         try:
-            root = ET.fromstring(xml_content)
-        except ET.ParseError as e:
-            logger.error(f"Failed to parse Qualys XML: {e}")
-            raise ValueError(f"Invalid XML format: {e}")
-        
-        findings = []
-        
-        # Try different Qualys XML structures
-        # Structure 1: SCAN/HOST/VULN
-        for host in root.findall('.//HOST'):
-            host_ip = self._get_text(host.find('IP'))
-            host_dns = self._get_text(host.find('DNS')) or self._get_text(host.find('NETBIOS'))
+            # Try different Qualys XML structures
+            # Structure 1: SCAN/HOST/VULN
+            # (descendant lookups use iter(tag), libxml2's own tree walk,
+            # rather than findall('.//TAG') path matching)
+            for host in self._iterparse(file_or_path, 'HOST', encoding):
+                findings = self._parse_host(host)
+                count += len(findings)
+                yield from findings
             
-            for vuln in host.findall('.//VULN'):
-                try:
-                    finding = self._parse_vuln(vuln, host_ip, host_dns)
-                    findings.append(finding)
-                except Exception as e:
-                    qid = self._get_text(vuln.find('QID'))
-                    logger.warning(f"Failed to parse QID {qid}: {e}")
-                    continue
-        
-        # Structure 2: ASSET_DATA_REPORT format
-        if not findings:
-            for host in root.findall('.//HOST_LIST/HOST'):
-                host_ip = self._get_text(host.find('IP'))
-                host_dns = self._get_text(host.find('DNS'))
-                
-                for vuln in host.findall('.//VULN_INFO_LIST/VULN_INFO'):
-                    try:
-                        finding = self._parse_vuln(vuln, host_ip, host_dns)
-                        findings.append(finding)
-                    except Exception as e:
-                        qid = self._get_text(vuln.find('QID'))
-                        logger.warning(f"Failed to parse QID {qid}: {e}")
+            # Structure 2: ASSET_DATA_REPORT format
+            if not count:
+                for host in self._iterparse(file_or_path, 'HOST', encoding):
+                    parent = host.getparent()
+                    if parent is None or parent.tag != 'HOST_LIST':
                         continue
-        
-        # Structure 3: Simple VULN_LIST
-        if not findings:
-            for vuln in root.findall('.//VULN'):
-                try:
+                    host_ip = self._get_text(host.find('IP'))
+                    host_dns = self._get_text(host.find('DNS'))
+                    
+                    vulns = host.findall('.//VULN_INFO_LIST/VULN_INFO')
+                    for finding in self._parse_vulns(vulns, host_ip, host_dns):
+                        count += 1
+                        yield finding
+            
+            # Structure 3: Simple VULN_LIST
+            if not count:
+                for vuln in self._iterparse(file_or_path, 'VULN', encoding):
                     # Get host info from attributes if available
                     host_ip = vuln.get('ip', 'Unknown')
                     host_dns = vuln.get('dns')
-                    finding = self._parse_vuln(vuln, host_ip, host_dns)
-                    findings.append(finding)
-                except Exception as e:
-                    qid = self._get_text(vuln.find('QID'))
-                    logger.warning(f"Failed to parse QID {qid}: {e}")
-                    continue
-        
-        logger.info(f"Parsed {len(findings)} findings from Qualys XML")
-        return findings
+                    for finding in self._parse_vulns((vuln,), host_ip, host_dns):
+                        count += 1
+                        yield finding
+        except ET.XMLSyntaxError as e:
+            logger.error(f"Failed to parse Qualys XML: {e}")
+            raise ValueError(f"Invalid XML format: {e}")
+        
+        logger.info(f"Parsed {count} findings from Qualys XML")
     
-    def to_atomik_format(self, finding: QualysFinding) -> Dict[str, Any]:
+    def parse_parallel(
+        self,
+        file_or_path: Union[str, BinaryIO],
+        encoding: Optional[str] = None
+    ) -> Iterator[QualysFinding]:
         """
-        Convert a QualysFinding to Atomik finding format.
+        Parse a Qualys XML export across a process pool.
         
-        Returns:
-            Dictionary ready for Atomik API
+        The parent streams the document and ships each serialized SCAN/HOST
+        to a worker, which re-parses it and runs _parse_host. Results are
+        yielded in document order, with at most two hosts per worker in
+        flight so memory stays bounded. Exports in the other layouts (no
+        findings from that pass), and single-core machines, fall back to
+        parse_stream.
+        
+        Args:
+            file_or_path: Path or seekable binary file object of the export
+            encoding: Override for the document's declared encoding
+            
+        Yields:
+            QualysFinding objects in document order
         """
-        # Build description
-        description_parts = []
+        if PARSE_WORKERS < 2:
+            yield from self.parse_stream(file_or_path, encoding)
+            return
         
-        if finding.category:
-            description_parts.append(f"<p><strong>Category:</strong> {finding.category}</p>")
+        pool = get_parse_pool()
+        pending = deque()
+        count = 0
+        
+        try:
+            for host in self._iterparse(file_or_path, 'HOST', encoding):
+                pending.append(pool.submit(_parse_host_bytes, ET.tostring(host)))
+                
+                while len(pending) > 2 * PARSE_WORKERS:
+                    findings = pending.popleft().result()
+                    count += len(findings)
+                    yield from findings
+        except ET.XMLSyntaxError as e:
+            for future in pending:
+                future.cancel()
+            logger.error(f"Failed to parse Qualys XML: {e}")
+            raise ValueError(f"Invalid XML format: {e}")
         
-        if finding.diagnosis:
-            description_parts.append(f"<div><h4>Diagnosis</h4>{finding.diagnosis}</div>")
+        while pending:
+            findings = pending.popleft().result()
+            count += len(findings)
+            yield from findings
         
-        if finding.consequence:
-            description_parts.append(f"<div><h4>Consequence</h4>{finding.consequence}</div>")
+        if not count:
+            yield from self.parse_stream(file_or_path, encoding)
+            return
         
-        description = "\n".join(description_parts) if description_parts else finding.title
+        logger.info(f"Parsed {count} findings from Qualys XML ({PARSE_WORKERS} workers)")
+    
+    def parse_xml(self, xml_content: Union[str, bytes]) -> List[QualysFinding]:
+        """
+        Parse Qualys XML export content.
         
-        # Build evidence from scan result
-        evidence_parts = []
+        Args:
+            xml_content: Raw XML string (or bytes) from Qualys export
+            
+        Returns:
+            List of QualysFinding objects
+        """
+        if isinstance(xml_content, str):
+            # Already decoded; re-encode and ignore the declared encoding
+            return list(self.parse_stream(BytesIO(xml_content.encode('utf-8')), encoding='utf-8'))
+        return list(self.parse_stream(BytesIO(xml_content)))
+    
+    def to_atomik_format(self, finding: QualysFinding) -> Dict[str, Any]:
+        """
+        Convert a QualysFinding to Atomik finding format.
         
-        # Add target info
-        target = finding.host_ip
-        if finding.port:
-            target += f":{finding.port}"
-        if finding.protocol:
-            target += f"/{finding.protocol}"
+        Returns:
+            Dictionary ready for Atomik API
+        """
+        # Description and references depend only on the QID's knowledge-base
+        # text, which repeats on every affected host; build them once per QID
+        description, references = self._static_html(
+            finding.title,
+            finding.category,
+            finding.diagnosis,
+            finding.consequence,
+            tuple(finding.cve_ids),
+            tuple(finding.bugtraq_ids),
+            tuple(finding.vendor_refs),
+        )
         
-        evidence_parts.append(f"<p><strong>Target:</strong> {target}</p>")
+        # Parts are appended only when present; on Python 3.11 this measures
+        # faster than joining a filtered tuple of conditional f-strings, and
+        # several times faster than rendering a (precompiled) Jinja template
+        # Evidence: target, DNS, truncated scan result, PCI and exploitability
+        port = f":{finding.port}" if finding.port else ""
+        protocol = f"/{finding.protocol}" if finding.protocol else ""
+        evidence_parts = [f"<p><strong>Target:</strong> {finding.host_ip}{port}{protocol}</p>"]
         
         if finding.host_dns:
             evidence_parts.append(f"<p><strong>DNS:</strong> {finding.host_dns}</p>")
         
-        # Add scan result as evidence
-        if finding.result:
-            result_escaped = self._escape_html(finding.result[:3000])
-            if len(finding.result) > 3000:
-                result_escaped += "\n... (truncated)"
-            evidence_parts.append(f"""
-<h4>Scan Result</h4>
-<pre><code>{result_escaped}</code></pre>
-""")
+        result = finding.result
+        if result:
+            truncated = TRUNCATED_MARKER if len(result) > RESULT_OUTPUT_LIMIT else ""
+            evidence_parts.append(SCAN_RESULT_HTML.format(
+                self._escape_html(result[:RESULT_OUTPUT_LIMIT]), truncated
+            ))
         
-        # Add PCI flag if set
         if finding.pci_flag:
-            evidence_parts.append("<p><strong>⚠️ PCI Compliance Issue</strong></p>")
+            evidence_parts.append(PCI_FLAG_HTML)
         
-        # Add exploitability info
         if finding.exploitability:
             evidence_parts.append(f"<p><strong>Exploitability:</strong> {finding.exploitability}</p>")
         
-        evidence = "\n".join(evidence_parts) if evidence_parts else None
-        
-        # Build references
-        refs_parts = []
-        
-        if finding.cve_ids:
-            cve_links = ", ".join(finding.cve_ids)
-            refs_parts.append(f"<p><strong>CVE:</strong> {cve_links}</p>")
-        
-        if finding.bugtraq_ids:
-            bugtraq_links = ", ".join(finding.bugtraq_ids)
-            refs_parts.append(f"<p><strong>Bugtraq:</strong> {bugtraq_links}</p>")
-        
-        if finding.vendor_refs:
-            refs_parts.append("<p><strong>Vendor References:</strong></p><ul>")
-            for ref in finding.vendor_refs[:10]:  # Limit to 10 refs
-                if ref.startswith('http'):
-                    refs_parts.append(f"<li><a href=\"{ref}\">{ref}</a></li>")
-                else:
-                    refs_parts.append(f"<li>{ref}</li>")
-            refs_parts.append("</ul>")
-        
-        references = "\n".join(refs_parts) if refs_parts else None
+        evidence = "\n".join(evidence_parts)
         
         # Build affected systems
         affected_systems = finding.host_ip
@@ -389,9 +509,55 @@ class QualysParser:
             "source_id": f"QID-{finding.qid}-{finding.host_ip}",
         }
     
+    @staticmethod
+    @lru_cache(maxsize=STATIC_HTML_CACHE_SIZE)
+    def _static_html(
+        title: str,
+        category: Optional[str],
+        diagnosis: Optional[str],
+        consequence: Optional[str],
+        cve_ids: Tuple[str, ...],
+        bugtraq_ids: Tuple[str, ...],
+        vendor_refs: Tuple[str, ...]
+    ) -> Tuple[str, Optional[str]]:
+        """Build the host-independent description and references HTML."""
+        description_parts = []
+        
+        if category:
+            description_parts.append(f"<p><strong>Category:</strong> {category}</p>")
+        
+        if diagnosis:
+            description_parts.append(f"<div><h4>Diagnosis</h4>{diagnosis}</div>")
+        
+        if consequence:
+            description_parts.append(f"<div><h4>Consequence</h4>{consequence}</div>")
+        
+        description = "\n".join(description_parts) or title
+        
+        # References: CVE and Bugtraq lines, then up to MAX_VENDOR_REFS entries
+        refs_parts = []
+        
+        if cve_ids:
+            refs_parts.append(f"<p><strong>CVE:</strong> {', '.join(cve_ids)}</p>")
+        
+        if bugtraq_ids:
+            refs_parts.append(f"<p><strong>Bugtraq:</strong> {', '.join(bugtraq_ids)}</p>")
+        
+        if vendor_refs:
+            refs_parts.append(VENDOR_REFS_HEADER_HTML)
+            for ref in vendor_refs[:MAX_VENDOR_REFS]:
+                refs_parts.append(VENDOR_LINK_HTML(ref) if ref.startswith('http') else f"<li>{ref}</li>")
+            refs_parts.append("</ul>")
+        
+        references = "\n".join(refs_parts) or None
+        return description, references
+    
     @staticmethod
     def _escape_html(text: str) -> str:
         """Escape HTML special characters for safe display in <pre> tags."""
+        # Kept as a replace chain on purpose: str.translate goes through a
+        # per-character mapping lookup and is several times slower on
+        # markup-heavy scanner output, and html.escape emits &#x27; for quotes
         return (text
             .replace('&', '&amp;')
             .replace('<', '&lt;')
@@ -403,3 +569,13 @@ class QualysParser:
 # Singleton instance
 qualys_parser = QualysParser()
 
+
+def _parse_host_bytes(xml_bytes: bytes) -> List[QualysFinding]:
+    """Process-pool task: parse one serialized SCAN/HOST."""
+    # The fragment was serialized from a well-formed document, but without its
+    # DTD: references to entities declared there would be "undefined" here.
+    # recover keeps them as unexpanded entity nodes, as in the streaming parse.
+    host = ET.fromstring(
+        xml_bytes, parser=ET.XMLParser(recover=True, **XML_PARSE_OPTIONS)
+    )
+    return qualys_parser._parse_host(host)
@@ -7,13 +7,142 @@ and plain text for DOCX/summary fields.
 SECURITY: This service is critical for preventing XSS attacks.
 All HTML output from rich text editors must be sanitized here.
 """
-import markdown
-import bleach
+import mistune
+import nh3
 import re
+from pygments import highlight
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import TextLexer, get_lexer_by_name
+from pygments.util import ClassNotFound
+from functools import lru_cache
+from html import escape, unescape
+from html.parser import HTMLParser
 from typing import Optional, Callable
 from urllib.parse import urlparse
 
 
+# Conversions are pure functions of their input, so results are memoized in
+# a shared LRU. Inputs longer than CONVERSION_CACHE_MAX_INPUT are converted
+# every time, which bounds what the cache can hold.
+CONVERSION_CACHE_SIZE = 1024
+CONVERSION_CACHE_MAX_INPUT = 64_000
+
+
+# html_to_markdown: Markdown emitted when entering and leaving each tag
+_MARKDOWN_ON_START = {
+    'strong': '**', 'b': '**', 'em': '*', 'i': '*', 'code': '`',
+    'h1': '# ', 'h2': '## ', 'h3': '### ', 'h4': '#### ',
+    'li': '- ', 'br': '\n', 'hr': '\n---\n',
+}
+_MARKDOWN_ON_END = {
+    'strong': '**', 'b': '**', 'em': '*', 'i': '*', 'code': '`',
+    'h1': '\n', 'h2': '\n', 'h3': '\n', 'h4': '\n',
+    'li': '\n', 'p': '\n\n',
+}
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# to_plain: inline tokens run together; every other token ends with a break
+_PLAIN_INLINE_TOKENS = frozenset({
+    'text', 'emphasis', 'strong', 'codespan', 'link', 'strikethrough',
+    'footnote_ref', 'abbr',
+})
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+
+# Image data URLs allowed in img src (only actual image types)
+_IMAGE_DATA_URL_PREFIXES = (
+    'data:image/png', 'data:image/jpeg', 'data:image/jpg',
+    'data:image/gif', 'data:image/webp', 'data:image/svg+xml',
+)
+_BLOCKED_HREF_SCHEMES = ('javascript:', 'vbscript:', 'data:')
+
+
+class _HighlightRenderer(mistune.HTMLRenderer):
+    """
+    HTML renderer that syntax-highlights fenced code with Pygments, in the
+    same `div.highlight` markup the codehilite extension produced. Blocks
+    without a known language are rendered as plain text, not guessed.
+    """
+    
+    _formatter = HtmlFormatter(cssclass='highlight', wrapcode=True)
+    
+    def block_code(self, code: str, info: Optional[str] = None) -> str:
+        lexer = TextLexer()
+        if info and info.strip():
+            try:
+                lexer = get_lexer_by_name(info.split(None, 1)[0])
+            except ClassNotFound:
+                pass
+        return highlight(code, lexer, self._formatter)
+
+
+class _PlainTextRenderer(mistune.BaseRenderer):
+    """
+    Renders the Markdown token stream straight to plain text for to_plain,
+    without building HTML only to strip it again.
+    
+    Output matches what rendering to HTML and stripping every tag gave:
+    text stays HTML-escaped, images and inline tags drop out, and raw HTML
+    blocks from the editor are reduced to their text.
+    """
+    
+    NAME = 'plain'
+    
+    def render_token(self, token, state) -> str:
+        kind = token['type']
+        if kind == 'block_html':
+            return nh3.clean(token['raw'], tags=set()) + '\n'
+        if kind in ('image', 'inline_html'):
+            return ''
+        if 'raw' in token:
+            text = escape(unescape(token['raw']), quote=False)
+        elif 'children' in token:
+            text = self.render_tokens(token['children'], state)
+        else:
+            text = ''
+        if kind in _PLAIN_INLINE_TOKENS:
+            return text
+        return text + '\n'
+
+
+class _MarkdownWriter(HTMLParser):
+    """
+    Single-pass HTML to Markdown conversion for html_to_markdown.
+    
+    Mapped tags emit their Markdown markers; every other tag is dropped and
+    only its text kept. Text stays HTML-escaped, so markup-like text can't
+    turn into tags when the Markdown is rendered again.
+    """
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+    
+    def handle_starttag(self, tag, attrs):
+        marker = _MARKDOWN_ON_START.get(tag)
+        if marker:
+            self.parts.append(marker)
+    
+    def handle_endtag(self, tag):
+        marker = _MARKDOWN_ON_END.get(tag)
+        if marker:
+            self.parts.append(marker)
+    
+    def handle_data(self, data):
+        self.parts.append(escape(data, quote=False))
+
+
+@lru_cache(maxsize=CONVERSION_CACHE_SIZE)
+def _cached_conversion(convert: Callable[..., str], text: str, *args) -> str:
+    return convert(text, *args)
+
+
+def _memoized(convert: Callable[..., str], text: str, *args) -> str:
+    """Run convert(text, *args) through the conversion cache."""
+    if len(text) > CONVERSION_CACHE_MAX_INPUT:
+        return convert(text, *args)
+    return _cached_conversion(convert, text, *args)
+
+
 class RichTextService:
     """Service for converting and sanitizing rich text content."""
     
@@ -43,6 +172,11 @@ class RichTextService:
     # Allowed URL schemes for links and images
     ALLOWED_PROTOCOLS = ['http', 'https', 'mailto', 'data']
     
+    # The allow-lists in the set form nh3 takes
+    _NH3_TAGS = set(ALLOWED_TAGS)
+    _NH3_ATTRIBUTES = {tag: set(attrs) for tag, attrs in ALLOWED_ATTRIBUTES.items()}
+    _NH3_URL_SCHEMES = set(ALLOWED_PROTOCOLS)
+    
     @staticmethod
     def _filter_img_src(tag: str, name: str, value: str) -> bool:
         """
@@ -71,53 +205,80 @@ class RichTextService:
             return True
         
         # Allow base64 image data URLs (only actual image types)
-        if value.startswith('data:image/'):
-            # Ensure it's a valid image type
-            valid_types = ['data:image/png', 'data:image/jpeg', 'data:image/jpg', 
-                          'data:image/gif', 'data:image/webp', 'data:image/svg+xml']
-            if any(value.startswith(t) for t in valid_types):
-                return True
+        if value.startswith(_IMAGE_DATA_URL_PREFIXES):
+            return True
         
         # Block everything else (javascript:, vbscript:, etc.)
         return False
     
     @classmethod
+    @lru_cache(maxsize=None)
     def _get_attribute_filter(cls) -> Callable:
         """
-        Returns an attribute filter function for bleach.
-        Combines allowed attributes with custom src validation.
+        Returns the attribute filter function for nh3, built once and shared.
+        
+        nh3 has already dropped attributes outside ALLOWED_ATTRIBUTES; this
+        adds the custom src/href validation. Returns the value to keep the
+        attribute, None to drop it.
         """
-        def filter_attributes(tag: str, name: str, value: str) -> bool:
-            # First check if attribute is in allowed list
-            allowed_for_tag = cls.ALLOWED_ATTRIBUTES.get(tag, [])
-            allowed_for_all = cls.ALLOWED_ATTRIBUTES.get('*', [])
-            
-            if name not in allowed_for_tag and name not in allowed_for_all:
-                return False
+        filter_img_src = cls._filter_img_src
+        
+        def filter_attributes(tag: str, name: str, value: str) -> Optional[str]:
+            # nh3 calls this for every kept attribute; most are neither src
+            # nor href, so test the name before anything else
+            if name == 'src':
+                # Special handling for img src
+                if tag == 'img' and not filter_img_src(tag, name, value):
+                    return None
+            elif name == 'href':
+                # Special handling for href - block javascript: URLs
+                if value.strip().lower().startswith(_BLOCKED_HREF_SCHEMES):
+                    return None
             
-            # Special handling for img src
-            if tag == 'img' and name == 'src':
-                return cls._filter_img_src(tag, name, value)
-            
-            # Special handling for href - block javascript: URLs
-            if name == 'href':
-                value_lower = value.strip().lower()
-                if value_lower.startswith(('javascript:', 'vbscript:', 'data:')):
-                    return False
-            
-            return True
+            return value
         
         return filter_attributes
     
-    # Markdown extensions for enhanced parsing
-    MARKDOWN_EXTENSIONS = [
-        'extra',           # Tables, fenced code, footnotes, etc.
-        'codehilite',      # Syntax highlighting for code blocks
-        'tables',          # Table support
-        'fenced_code',     # Fenced code blocks (```)
-        'nl2br',           # Newlines to <br>
-        'sane_lists',      # Better list handling
+    @classmethod
+    def _clean(cls, html: str) -> str:
+        """
+        Sanitize HTML against the allow-lists with nh3 (Rust ammonia).
+        
+        Disallowed tags are stripped with their text kept, except script and
+        style, whose contents are dropped too. Existing rel attributes are
+        left as written rather than rewritten.
+        """
+        return nh3.clean(
+            html,
+            tags=cls._NH3_TAGS,
+            attributes=cls._NH3_ATTRIBUTES,
+            attribute_filter=cls._get_attribute_filter(),
+            url_schemes=cls._NH3_URL_SCHEMES,
+            link_rel=None,
+        )
+    
+    # mistune plugins for enhanced parsing (fenced code and lists are core)
+    MARKDOWN_PLUGINS = [
+        'table',           # Table support
+        'footnotes',       # Footnotes
+        'def_list',        # Definition lists
+        'abbr',            # Abbreviations
     ]
+    
+    # Shared parser: raw HTML from the editor passes through (sanitized
+    # afterwards), newlines become <br>, code blocks are highlighted
+    _markdown = mistune.create_markdown(
+        escape=False,
+        hard_wrap=True,
+        renderer=_HighlightRenderer(escape=False),
+        plugins=MARKDOWN_PLUGINS,
+    )
+    
+    # Same grammar, rendered to plain text for to_plain
+    _markdown_plain = mistune.create_markdown(
+        renderer=_PlainTextRenderer(),
+        plugins=MARKDOWN_PLUGINS,
+    )
 
     @classmethod
     def to_html(cls, text: str, strip_unsafe: bool = True) -> str:
@@ -134,28 +295,17 @@ class RichTextService:
         if not text:
             return ""
         
+        return _memoized(cls._markdown_to_html, text, strip_unsafe)
+    
+    @classmethod
+    def _markdown_to_html(cls, text: str, strip_unsafe: bool) -> str:
         # Convert Markdown to HTML
-        html = markdown.markdown(
-            text, 
-            extensions=RichTextService.MARKDOWN_EXTENSIONS,
-            extension_configs={
-                'codehilite': {
-                    'css_class': 'highlight',
-                    'linenums': False,
-                }
-            }
-        )
+        html = cls._markdown(text)
         
         if strip_unsafe:
             # Sanitize HTML to prevent XSS
             # SECURITY: Uses custom attribute filter to validate img src URLs
-            html = bleach.clean(
-                html, 
-                tags=RichTextService.ALLOWED_TAGS, 
-                attributes=cls._get_attribute_filter(),
-                protocols=cls.ALLOWED_PROTOCOLS,
-                strip=True
-            )
+            html = cls._clean(html)
         
         return html
 
@@ -173,14 +323,15 @@ class RichTextService:
         if not text:
             return ""
         
-        # First convert Markdown to HTML
-        html = markdown.markdown(text)
-        
-        # Strip all HTML tags
-        plain = bleach.clean(html, tags=[], strip=True)
+        return _memoized(RichTextService._markdown_to_plain, text)
+    
+    @staticmethod
+    def _markdown_to_plain(text: str) -> str:
+        # Render the token stream directly to text (no HTML in between)
+        plain = RichTextService._markdown_plain(text)
         
         # Clean up extra whitespace
-        plain = re.sub(r'\s+', ' ', plain).strip()
+        plain = _WHITESPACE_RE.sub(' ', plain).strip()
         
         return plain
 
@@ -205,13 +356,11 @@ class RichTextService:
         if not html:
             return ""
         
-        return bleach.clean(
-            html,
-            tags=cls.ALLOWED_TAGS,
-            attributes=cls._get_attribute_filter(),
-            protocols=cls.ALLOWED_PROTOCOLS,
-            strip=True
-        )
+        return _memoized(cls._clean_html, html)
+    
+    @classmethod
+    def _clean_html(cls, html: str) -> str:
+        return cls._clean(html)
 
     @staticmethod
     def html_to_markdown(html: str) -> str:
@@ -228,37 +377,26 @@ class RichTextService:
         if not html:
             return ""
         
-        # Basic HTML to Markdown conversion using regex
-        text = html
-        
-        # Convert common HTML tags to Markdown
-        replacements = [
-            (r'<strong>(.*?)</strong>', r'**\1**'),
-            (r'<b>(.*?)</b>', r'**\1**'),
-            (r'<em>(.*?)</em>', r'*\1*'),
-            (r'<i>(.*?)</i>', r'*\1*'),
-            (r'<h1>(.*?)</h1>', r'# \1\n'),
-            (r'<h2>(.*?)</h2>', r'## \1\n'),
-            (r'<h3>(.*?)</h3>', r'### \1\n'),
-            (r'<h4>(.*?)</h4>', r'#### \1\n'),
-            (r'<code>(.*?)</code>', r'`\1`'),
-            (r'<br\s*/?>', '\n'),
-            (r'<hr\s*/?>', '\n---\n'),
-            (r'<p>(.*?)</p>', r'\1\n\n'),
-            (r'<li>(.*?)</li>', r'- \1\n'),
-        ]
-        
-        for pattern, replacement in replacements:
-            text = re.sub(pattern, replacement, text, flags=re.DOTALL | re.IGNORECASE)
-        
-        # Strip remaining HTML tags
-        text = bleach.clean(text, tags=[], strip=True)
+        return _memoized(RichTextService._convert_html_to_markdown, html)
+    
+    @staticmethod
+    def _convert_html_to_markdown(html: str) -> str:
+        # One pass over the markup, emitting Markdown as tags open and close
+        writer = _MarkdownWriter()
+        writer.feed(html)
+        writer.close()
+        text = ''.join(writer.parts)
         
         # Clean up whitespace
-        text = re.sub(r'\n{3,}', '\n\n', text).strip()
+        text = _BLANK_LINES_RE.sub('\n\n', text).strip()
         
         return text
 
+    @staticmethod
+    def clear_cache() -> None:
+        """Drop all memoized conversions (e.g. between tests)."""
+        _cached_conversion.cache_clear()
+
     @staticmethod
     def escape_for_pdf(text: str) -> str:
         """
@@ -280,8 +418,8 @@ class RichTextService:
             ('>', '&gt;'),
         ]
         
-        for char, escape in escapes:
-            text = text.replace(char, escape)
+        for char, replacement in escapes:
+            text = text.replace(char, replacement)
         
         return text
 
@@ -0,0 +1,96 @@
+"""
+Tests for Database Backups
+
+These tests verify that:
+1. A failed PostgreSQL backup never leaves a partial archive behind
+2. This holds whether pigz or pg_dump is the process that fails
+
+A truncated archive would be listed as the newest backup and counted by the
+retention policy, which could then delete a good older one.
+"""
+import os
+import shutil
+import stat
+
+import pytest
+from app.core import backup
+from app.core.backup import DatabaseBackup
+
+
+FAKE_PG_DUMP = """#!/bin/sh
+echo "pg_dump: connecting" >&2
+head -c 4000000 /dev/zero
+exit {exit_code}
+"""
+
+
+@pytest.fixture
+def bin_dir(tmp_path, monkeypatch):
+    """A directory for fake executables, searched first on PATH."""
+    path = tmp_path / "bin"
+    path.mkdir()
+    monkeypatch.setenv("PATH", f"{path}{os.pathsep}{os.environ.get('PATH', '')}")
+    return path
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """A backup manager for a PostgreSQL database."""
+    monkeypatch.setattr(backup, "BACKUP_COMPRESSION_FORMAT", "gzip")
+    monkeypatch.setattr(backup, "BACKUP_PG_JOBS", 1)
+    
+    manager = DatabaseBackup(backup_dir=tmp_path / "backups")
+    # Pre-seed the cached_property instead of parsing settings.DATABASE_URL
+    manager.__dict__["_db_parts"] = {
+        "type": "postgresql",
+        "host": "localhost",
+        "port": "5432",
+        "user": "atomik",
+        "password": "secret",
+        "database": "atomik",
+    }
+    return manager
+
+
+def install_pg_dump(bin_dir, exit_code: int = 0) -> None:
+    """Install a pg_dump that writes 4 MB of output, then exits with exit_code."""
+    script = bin_dir / "pg_dump"
+    script.write_text(FAKE_PG_DUMP.format(exit_code=exit_code))
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+
+
+def use_pigz(monkeypatch, path) -> None:
+    """Make shutil.which('pigz') return path (None: pigz not installed)."""
+    which = shutil.which
+    
+    def fake_which(name, *args, **kwargs):
+        return path if name == "pigz" else which(name, *args, **kwargs)
+    
+    monkeypatch.setattr(backup.shutil, "which", fake_which)
+
+
+class TestPostgresBackupFailures:
+    """Tests for cleanup when a PostgreSQL backup fails."""
+    
+    @pytest.mark.asyncio
+    async def test_pigz_failure_removes_archive(self, manager, bin_dir, monkeypatch):
+        """A failing pigz must not leave a truncated .sql.gz behind."""
+        install_pg_dump(bin_dir)
+        use_pigz(monkeypatch, shutil.which("false") or "/bin/false")
+        
+        with pytest.raises(RuntimeError, match="pigz"):
+            await manager.backup_postgresql()
+        
+        assert list(manager.backup_dir.glob("atomik_backup_*")) == []
+        assert manager.list_backups() == []
+    
+    @pytest.mark.asyncio
+    async def test_pg_dump_failure_removes_archive(self, manager, bin_dir, monkeypatch):
+        """A failing pg_dump must not leave a partial archive behind."""
+        install_pg_dump(bin_dir, exit_code=1)
+        use_pigz(monkeypatch, None)
+        
+        with pytest.raises(RuntimeError, match="pg_dump failed"):
+            await manager.backup_postgresql()
+        
+        assert list(manager.backup_dir.glob("atomik_backup_*")) == []
@@ -14,6 +14,7 @@ from app.core.file_validation import (
     is_safe_image,
     validate_upload,
     detect_file_type,
+    SVG_MAX_SCAN_BYTES,
 )
 
 
@@ -245,6 +246,20 @@ class TestSVGSecurity:
         
         assert is_safe is False
         assert 'foreignobject' in reason.lower()
+    
+    def test_rejects_svg_over_scan_limit(self):
+        """SVGs too large to scan in full should be rejected, not partially scanned."""
+        padding = b'<!-- padding -->' * (SVG_MAX_SCAN_BYTES // 16)
+        oversized_svg = (
+            b'<svg xmlns="http://www.w3.org/2000/svg">'
+            + padding
+            + b'<script>alert(1)</script></svg>'
+        )
+        
+        is_safe, reason = is_safe_image(oversized_svg, 'svg')
+        
+        assert is_safe is False
+        assert 'too large' in reason.lower()
 
 
 class TestUploadValidation:
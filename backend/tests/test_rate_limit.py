@@ -13,7 +13,9 @@ import pytest
 import time
 from app.core.rate_limit import (
     InMemoryRateLimiter,
+    get_path_bucket,
     get_rate_limit_for_path,
+    make_rate_key,
     RATE_LIMITS,
 )
 
@@ -83,16 +85,17 @@ class TestInMemoryRateLimiter:
         limiter.is_allowed('test_key', limit=10)
         
         # Verify key exists
-        assert 'test_key' in limiter.requests
+        assert 'test_key' in limiter.buckets
         
         # Manually age the entries
-        limiter.requests['test_key'] = [time.time() - 120]  # 2 minutes ago
+        two_minutes_ago = int((time.monotonic() - 120) // limiter.window_size)
+        limiter.buckets['test_key'] = (two_minutes_ago, 1, 0)
         
         # Trigger cleanup
         limiter._cleanup()
         
         # Old entries should be removed
-        assert len(limiter.requests.get('test_key', [])) == 0
+        assert 'test_key' not in limiter.buckets
 
 
 class TestRateLimitConfiguration:
@@ -239,3 +242,18 @@ class TestEndpointSpecificLimits:
             limit = get_rate_limit_for_path(path)
             assert limit == RATE_LIMITS['/api/imports/'], f"Wrong limit for {path}"
 
+
+class TestRateLimitKeys:
+    """Tests for rate limit key construction."""
+    
+    def test_resource_ids_share_a_bucket(self):
+        """Requests for different resources behind one route share a limit."""
+        assert get_path_bucket('/api/findings/clx8abc123def456') == '/api/findings/:id'
+        assert get_path_bucket('/api/projects/42/findings') == '/api/projects/:id/findings'
+        assert make_rate_key('1.2.3.4', '', '/api/findings/1') == make_rate_key('1.2.3.4', '', '/api/findings/2')
+    
+    def test_static_segments_are_kept(self):
+        """Route names must not be collapsed into the ID bucket."""
+        assert get_path_bucket('/api/auth/login') == '/api/auth/login'
+        assert make_rate_key('1.2.3.4', '', '/api/auth/login') != make_rate_key('1.2.3.4', '', '/api/auth/register')
+
@@ -308,3 +308,34 @@ class TestImageSecurity:
         assert 'alt=' in result
         # width/height may or may not be preserved depending on config
 
+
+
+class TestConversionCache:
+    """Tests for memoized rich text conversions."""
+    
+    def setup_method(self):
+        RichTextService.clear_cache()
+    
+    def test_repeated_input_is_served_from_cache(self):
+        """Identical input should return the cached result."""
+        first = RichTextService.to_html('**bold** text')
+        second = RichTextService.to_html('**bold** text')
+        
+        assert first is second
+        assert '<strong>bold</strong>' in first
+    
+    def test_cache_keys_on_arguments(self):
+        """strip_unsafe must be part of the key, not just the text."""
+        markdown_text = 'Hi <script>alert(1)</script>'
+        unsafe = RichTextService.to_html(markdown_text, strip_unsafe=False)
+        safe = RichTextService.to_html(markdown_text)
+        
+        assert '<script>' in unsafe
+        assert '<script>' not in safe
+    
+    def test_conversions_do_not_share_entries(self):
+        """The same text through different conversions must not collide."""
+        text = '<p>Hello <strong>world</strong></p>'
+        
+        assert RichTextService.sanitize_html(text) == text
+        assert RichTextService.html_to_markdown(text) == 'Hello **world**'
@@ -0,0 +1,245 @@
+"""
+Tests for the Nessus and Qualys Scanner Import Parsers
+
+These tests verify that:
+1. Streaming and process-pool parsing produce the same findings
+2. Every supported Qualys export layout is parsed
+3. Malformed XML is rejected with ValueError
+
+SECURITY: Scanner exports are untrusted uploads - external and internal
+entities must never be expanded (XXE).
+"""
+from io import BytesIO
+
+import pytest
+from app.services import nessus_parser, qualys_parser
+from app.services.nessus_parser import NessusParser
+from app.services.qualys_parser import QualysParser
+
+
+NESSUS_XML = b"""<?xml version="1.0"?>
+<NessusClientData_v2>
+<Report name="scan">
+<ReportHost name="web01">
+<HostProperties><tag name="host-ip">10.0.0.1</tag></HostProperties>
+<ReportItem port="443" protocol="tcp" severity="3" pluginID="1001" pluginName="Weak TLS">
+<description>Weak &amp; old ciphers</description>
+<solution>Disable them</solution>
+<plugin_output>TLSv1.0</plugin_output>
+<cvss_base_score>7.5</cvss_base_score>
+<cve>CVE-2020-0001</cve>
+<see_also>https://example.com/tls</see_also>
+</ReportItem>
+<ReportItem port="80" protocol="tcp" severity="0" pluginID="1002" pluginName="HTTP Info"/>
+</ReportHost>
+<ReportHost name="db01">
+<HostProperties><tag name="host-ip">10.0.0.2</tag></HostProperties>
+<ReportItem port="5432" protocol="tcp" severity="4" pluginID="1003" pluginName="Default Password">
+<description>postgres/postgres</description>
+<cvss3_base_score>9.8</cvss3_base_score>
+<cwe>798</cwe>
+</ReportItem>
+</ReportHost>
+<ReportHost name="10.0.0.3">
+<ReportItem port="22" protocol="tcp" severity="2" pluginID="1004" pluginName="SSH CBC"/>
+</ReportHost>
+</Report>
+</NessusClientData_v2>
+"""
+
+QUALYS_VULN = """<QID>{qid}</QID>
+<TITLE><![CDATA[Finding {qid}]]></TITLE>
+<SEVERITY>{severity}</SEVERITY>
+<PORT>443</PORT><PROTOCOL>tcp</PROTOCOL>
+<DIAGNOSIS>Diagnosis {qid}</DIAGNOSIS>
+<SOLUTION>Patch {qid}</SOLUTION>
+<RESULT>output {qid}</RESULT>
+<CVE_ID_LIST><CVE_ID><ID>CVE-2021-{qid}</ID></CVE_ID></CVE_ID_LIST>"""
+
+QUALYS_SCAN_XML = f"""<?xml version="1.0"?>
+<SCAN>
+<HOST><IP>10.1.0.1</IP><DNS>app01</DNS><VULNS><CAT>
+<VULN>{QUALYS_VULN.format(qid=101, severity=5)}</VULN>
+<VULN>{QUALYS_VULN.format(qid=102, severity=2)}</VULN>
+</CAT></VULNS></HOST>
+<HOST><IP>10.1.0.2</IP><NETBIOS>APP02</NETBIOS><VULNS><CAT>
+<VULN>{QUALYS_VULN.format(qid=103, severity=4)}</VULN>
+</CAT></VULNS></HOST>
+<HOST><IP>10.1.0.3</IP><VULNS><CAT>
+<VULN>{QUALYS_VULN.format(qid=104, severity=3)}</VULN>
+</CAT></VULNS></HOST>
+</SCAN>
+""".encode()
+
+QUALYS_ASSET_XML = f"""<?xml version="1.0"?>
+<ASSET_DATA_REPORT><HOST_LIST>
+<HOST><IP>10.2.0.1</IP><DNS>a1</DNS><VULN_INFO_LIST>
+<VULN_INFO>{QUALYS_VULN.format(qid=201, severity=5)}</VULN_INFO>
+<VULN_INFO>{QUALYS_VULN.format(qid=202, severity=1)}</VULN_INFO>
+</VULN_INFO_LIST></HOST>
+<HOST><IP>10.2.0.2</IP><VULN_INFO_LIST>
+<VULN_INFO>{QUALYS_VULN.format(qid=203, severity=3)}</VULN_INFO>
+</VULN_INFO_LIST></HOST>
+</HOST_LIST></ASSET_DATA_REPORT>
+""".encode()
+
+QUALYS_LIST_XML = f"""<?xml version="1.0"?>
+<VULN_LIST>
+<VULN ip="10.3.0.1" dns="l1">{QUALYS_VULN.format(qid=301, severity=4)}</VULN>
+<VULN ip="10.3.0.2">{QUALYS_VULN.format(qid=302, severity=2)}</VULN>
+</VULN_LIST>
+""".encode()
+
+XXE_NESSUS_XML = b"""<?xml version="1.0"?>
+<!DOCTYPE NessusClientData_v2 [
+<!ENTITY internal "EXPANDED-INTERNAL">
+<!ENTITY external SYSTEM "file:///etc/hostname">
+]>
+<NessusClientData_v2><Report name="scan"><ReportHost name="web01">
+<ReportItem port="443" protocol="tcp" severity="3" pluginID="1" pluginName="XXE">
+<description>&internal;</description>
+<plugin_output>&external;</plugin_output>
+</ReportItem>
+</ReportHost></Report></NessusClientData_v2>
+"""
+
+XXE_QUALYS_XML = b"""<?xml version="1.0"?>
+<!DOCTYPE SCAN [
+<!ENTITY internal "EXPANDED-INTERNAL">
+<!ENTITY external SYSTEM "file:///etc/hostname">
+]>
+<SCAN><HOST><IP>10.1.0.1</IP><VULNS><CAT><VULN>
+<QID>1</QID><TITLE>XXE</TITLE><SEVERITY>3</SEVERITY>
+<DIAGNOSIS>&internal;</DIAGNOSIS>
+<RESULT>&external;</RESULT>
+</VULN></CAT></VULNS></HOST></SCAN>
+"""
+
+
+@pytest.fixture
+def parallel_workers(monkeypatch):
+    """Force the process-pool path even on single-core machines."""
+    monkeypatch.setattr(nessus_parser, 'PARSE_WORKERS', 2)
+    monkeypatch.setattr(qualys_parser, 'PARSE_WORKERS', 2)
+
+
+class TestNessusParser:
+    """Tests for Nessus .nessus export parsing."""
+    
+    def test_parses_every_host(self):
+        """Findings from every ReportHost are returned, with host IPs resolved."""
+        findings = list(NessusParser().parse_stream(BytesIO(NESSUS_XML)))
+        
+        assert [f.plugin_id for f in findings] == ['1001', '1002', '1003', '1004']
+        assert [f.host_ip for f in findings] == ['10.0.0.1', '10.0.0.1', '10.0.0.2', '10.0.0.3']
+        assert findings[0].description == 'Weak & old ciphers'
+        assert findings[0].cve_ids == ['CVE-2020-0001']
+        assert findings[2].cvss_score == 9.8
+        assert findings[2].cwe_ids == ['CWE-798']
+    
+    def test_parallel_matches_stream(self, parallel_workers):
+        """The process-pool parser yields the same findings in the same order."""
+        parser = NessusParser()
+        
+        streamed = list(parser.parse_stream(BytesIO(NESSUS_XML)))
+        parallel = list(parser.parse_parallel(BytesIO(NESSUS_XML)))
+        
+        assert parallel == streamed
+    
+    def test_parse_xml_matches_stream(self):
+        """parse_xml accepts str and bytes and agrees with parse_stream."""
+        parser = NessusParser()
+        
+        streamed = list(parser.parse_stream(BytesIO(NESSUS_XML)))
+        
+        assert parser.parse_xml(NESSUS_XML) == streamed
+        assert parser.parse_xml(NESSUS_XML.decode()) == streamed
+    
+    def test_entities_not_expanded(self, parallel_workers):
+        """Internal and external entities must not be resolved (XXE)."""
+        parser = NessusParser()
+        
+        for findings in (
+            list(parser.parse_stream(BytesIO(XXE_NESSUS_XML))),
+            list(parser.parse_parallel(BytesIO(XXE_NESSUS_XML))),
+        ):
+            assert len(findings) == 1
+            assert 'EXPANDED-INTERNAL' not in findings[0].description
+            assert findings[0].plugin_output == ''
+    
+    def test_malformed_xml_raises_value_error(self, parallel_workers):
+        """Broken documents raise ValueError, not a parser-specific error."""
+        parser = NessusParser()
+        broken = NESSUS_XML[:len(NESSUS_XML) // 2]
+        
+        with pytest.raises(ValueError):
+            list(parser.parse_stream(BytesIO(broken)))
+        with pytest.raises(ValueError):
+            list(parser.parse_parallel(BytesIO(broken)))
+        with pytest.raises(ValueError):
+            parser.parse_xml(b'<NessusClientData_v2><Report>')
+
+
+class TestQualysParser:
+    """Tests for Qualys XML export parsing."""
+    
+    @pytest.mark.parametrize('xml_content, qids', [
+        (QUALYS_SCAN_XML, ['101', '102', '103', '104']),
+        (QUALYS_ASSET_XML, ['201', '202', '203']),
+        (QUALYS_LIST_XML, ['301', '302']),
+    ])
+    def test_parses_every_layout(self, xml_content, qids):
+        """SCAN/HOST, ASSET_DATA_REPORT and VULN_LIST exports are all parsed."""
+        findings = list(QualysParser().parse_stream(BytesIO(xml_content)))
+        
+        assert [f.qid for f in findings] == qids
+        assert all(f.cve_ids == [f"CVE-2021-{f.qid}"] for f in findings)
+    
+    def test_host_details(self):
+        """Host IP and DNS (or NetBIOS) name are taken from each HOST."""
+        findings = list(QualysParser().parse_stream(BytesIO(QUALYS_SCAN_XML)))
+        
+        assert [(f.host_ip, f.host_dns) for f in findings] == [
+            ('10.1.0.1', 'app01'),
+            ('10.1.0.1', 'app01'),
+            ('10.1.0.2', 'APP02'),
+            ('10.1.0.3', ''),
+        ]
+    
+    @pytest.mark.parametrize('xml_content', [
+        QUALYS_SCAN_XML,
+        QUALYS_ASSET_XML,
+        QUALYS_LIST_XML,
+    ])
+    def test_parallel_matches_stream(self, parallel_workers, xml_content):
+        """The process-pool parser agrees with parse_stream on every layout."""
+        parser = QualysParser()
+        
+        streamed = list(parser.parse_stream(BytesIO(xml_content)))
+        parallel = list(parser.parse_parallel(BytesIO(xml_content)))
+        
+        assert parallel == streamed
+    
+    def test_entities_not_expanded(self, parallel_workers):
+        """Internal and external entities must not be resolved (XXE)."""
+        parser = QualysParser()
+        
+        for findings in (
+            list(parser.parse_stream(BytesIO(XXE_QUALYS_XML))),
+            list(parser.parse_parallel(BytesIO(XXE_QUALYS_XML))),
+        ):
+            assert len(findings) == 1
+            assert 'EXPANDED-INTERNAL' not in findings[0].diagnosis
+            assert findings[0].result == ''
+    
+    def test_malformed_xml_raises_value_error(self, parallel_workers):
+        """Broken documents raise ValueError, not a parser-specific error."""
+        parser = QualysParser()
+        broken = QUALYS_SCAN_XML[:len(QUALYS_SCAN_XML) // 2]
+        
+        with pytest.raises(ValueError):
+            list(parser.parse_stream(BytesIO(broken)))
+        with pytest.raises(ValueError):
+            list(parser.parse_parallel(BytesIO(broken)))
+        with pytest.raises(ValueError):
+            parser.parse_xml(b'<SCAN><HOST>')